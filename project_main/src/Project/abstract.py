@@ -1,41 +1,90 @@
+import os
+import sys
 from abc import ABC, abstractmethod
 
 
 class UserView(ABC):
     @abstractmethod
-    def display_contacts(self, contacts):
+    def display(self, result):
         pass
 
-    @abstractmethod
+    def display_contacts(self, contacts):
+        self.display(str(contact) for contact in contacts)
+
     def display_notes(self, notes):
-        pass
+        self.display(str(note) for note in notes)
 
-    @abstractmethod
     def display_commands(self, commands):
-        pass
+        self.display(["Available commands:", *commands])
 
 
 class ConsoleUserView(UserView):
-    def display_contacts(self, contacts):
-        print("Contacts:")
-        for contact in contacts:
-            print(f"Name: {contact.name}, Phone: {contact.phone}")
-
-    def display_notes(self, notes):
-        print("Notes:")
-        for note in notes:
-            print(f"Title: {note.title}, Content: {note.content}")
-
-    def display_commands(self, commands):
-        print("Available commands:")
-        for command in commands:
-            print(command)
+    def __init__(self, stream=None, chunk_size=64 * 1024, pager=True):
+        self.stream = stream or sys.stdout
+        self.chunk_size = chunk_size
+        self.pager = pager
+
+    def display(self, result):
+        if result is None:
+            return
+        if isinstance(result, str):
+            result = [result]
+        self.write_lines(result)
+
+    def page_height(self):
+        import shutil
+
+        if not self.pager or not self.stream.isatty() or "PAGER" not in os.environ and not shutil.which("less"):
+            return None
+        return shutil.get_terminal_size().lines - 1
+
+    def open_pager(self):
+        import shlex
+        import subprocess
+
+        command = os.environ.get("PAGER", "less -FRX")
+        return subprocess.Popen(shlex.split(command), stdin=subprocess.PIPE, text=True)
+
+    def write_lines(self, lines):
+        out = self.stream
+        pager = None
+        height = self.page_height()
+        buffer = []
+        size = 0
+        count = 0
+        try:
+            for line in lines:
+                buffer.append(line)
+                buffer.append("\n")
+                size += len(line) + 1
+                count += line.count("\n") + 1
+                if pager is None and height is not None and count > height:
+                    pager = self.open_pager()
+                    out = pager.stdin
+                if size >= self.chunk_size:
+                    out.write("".join(buffer))
+                    buffer.clear()
+                    size = 0
+            out.write("".join(buffer))
+            out.flush()
+        except BrokenPipeError:
+            pass
+        finally:
+            if pager is not None:
+                try:
+                    pager.stdin.close()
+                except BrokenPipeError:
+                    pass
+                pager.wait()
 
 
 class Bot:
     def __init__(self, user_view):
         self.user_view = user_view
 
+    def show(self, result):
+        self.user_view.display(result)
+
     def show_contacts(self, contacts):
         self.user_view.display_contacts(contacts)
 
@@ -44,34 +93,3 @@ class Bot:
 
     def show_commands(self, commands):
         self.user_view.display_commands(commands)
-
-
-# Пример использования
-contacts = [
-    {"name": "John Doe", "phone": "1234567890"},
-    {"name": "Jane Smith", "phone": "9876543210"}
-]
-
-notes = [
-    {"title": "Meeting", "content": "Discuss project details"},
-    {"title": "Reminder", "content": "Buy groceries"}
-]
-
-commands = ["add_contact", "add_note", "view_contacts", "view_notes"]
-
-console_view = ConsoleUserView()
-bot = Bot(console_view)
-
-bot.show_contacts(contacts)
-bot.show_notes(notes)
-bot.show_commands(commands)
-'''В этом примере создан абстрактный базовый класс UserView,
-который определяет методы display_contacts(), display_notes()
-и display_commands(). Класс ConsoleUserView является конкретной
-реализацией базового класса, где эти методы выводят информацию
-в консоль.
-
-Класс Bot принимает экземпляр UserView и использует его для
-отображения контактов, заметок и команд. Таким образом, при
-необходимости изменить способ вывода информации пользователю,
-достаточно создать новую реализацию класса UserView и передать ее в Bot.'''
\ No newline at end of file
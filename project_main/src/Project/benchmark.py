@@ -0,0 +1,248 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import random
+import shutil
+import string
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+import bot
+from benchmark_memory import generate_records, generate_notes, max_rss
+from metrics import Histogram
+from sessions import current_session
+
+RESULTS_DIR = "benchmark_results"
+SKIPPED = {
+    "sort": "moves files on disk",
+    "exit": "ends the session",
+    "good bye": "ends the session",
+    "close": "ends the session",
+}
+
+
+def letters(number: int) -> str:
+    return "".join(string.ascii_lowercase[int(digit)] for digit in str(number))
+
+
+class Dataset:
+    def __init__(self, size: int, seed: int, directory: str) -> None:
+        self.rnd = random.Random(seed)
+        self.names = []
+        self.phones = []
+        self.csv = os.path.join(directory, "contacts.csv")
+        with open(self.csv, "w", encoding="utf-8", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["name", "phones", "emails", "birthday"])
+            for record in generate_records(size, seed):
+                phones = [phone.value for phone in record.phones]
+                self.names.append(record.get_name())
+                self.phones.append(phones[0])
+                writer.writerow([
+                    record.get_name(),
+                    ";".join(phones),
+                    ";".join(email.value for email in record.emails),
+                    record.birthday.value.strftime("%d.%m.%Y") if record.birthday else "",
+                ])
+        self.notes = [f"{text} {' '.join(tags)}" for text, tags in generate_notes(max(size // 10, 1), seed)]
+        self.tags = sorted({tag for note in self.notes for tag in note.split() if tag.startswith("#")})
+
+    def name(self) -> str:
+        return self.rnd.choice(self.names)
+
+    def phone(self) -> str:
+        return self.rnd.choice(self.phones)
+
+    def tag(self) -> str:
+        return self.rnd.choice(self.tags)
+
+    def new_phone(self) -> str:
+        return "0" + "".join(self.rnd.choice(string.digits) for _ in range(9))
+
+
+READ_CASES = [
+    ("hello", 1, lambda data: "hello"),
+    ("help", 1, lambda data: "help"),
+    ("phone", 1, lambda data: f"phone {data.name()}"),
+    ("email", 1, lambda data: f"email {data.name()}"),
+    ("birthday", 1, lambda data: f"birthday {data.name()}"),
+    ("find", 1, lambda data: f"find {data.name()}"),
+    ("find prefix", 1, lambda data: f"find {data.name()[:3]}*"),
+    ("search", 20, lambda data: f"search {data.name()[2:6]} i"),
+    ("search phone", 20, lambda data: f"search {data.phone()[3:8]}"),
+    ("reverse", 1, lambda data: f"reverse {data.phone()}"),
+    ("reverse prefix", 1, lambda data: f"reverse {data.phone()[:6]} 20"),
+    ("birthdays", 20, lambda data: "birthdays 30"),
+    ("next", 1, lambda data: "next 10"),
+    ("page", 1, lambda data: f"page {data.rnd.randint(1, max(len(data.names) // 20, 1))} 20"),
+    ("notes", 1, lambda data: f"notes {data.rnd.randint(1, max(len(data.tags) // 3, 1))} 3"),
+    ("show notes", 20, lambda data: f"show notes {data.tag()}"),
+    ("show notes words", 20, lambda data: "show notes project deadline limit=20"),
+    ("hashtag", 20, lambda data: f"hashtag {data.tag()}"),
+    ("tags", 1, lambda data: f"tags {data.tag()[:4]} 10"),
+    ("query", 20, lambda data: f"query phone:{data.phone()[:4]}* AND bday:<30d"),
+    ("show all", 200, lambda data: "show all"),
+    ("sessions", 1, lambda data: "sessions"),
+    ("stats", 1, lambda data: "stats"),
+]
+
+WRITE_CASES = [
+    ("add", lambda data, i: f"add bench{letters(i)} {data.new_phone()}"),
+    ("change", lambda data, i: f"change {data.name()} {data.new_phone()}"),
+    ("modify", lambda data, i: f"modify {data.tag()} 0 edited note {i}"),
+    ("delete", lambda data, i: f"delete bench{letters(i)}"),
+]
+
+
+def bench(commands) -> dict:
+    histogram = Histogram()
+    errors = 0
+    start = time.perf_counter()
+    for command in commands:
+        began = time.perf_counter()
+        entry = bot.run_command(command)
+        histogram.record((time.perf_counter() - began) * 1_000_000)
+        errors += not entry["ok"]
+    elapsed = time.perf_counter() - start
+    latency = histogram.summary()
+    del latency["buckets"]
+    return {
+        "command": commands[0].split(" ")[0] if commands else "",
+        "operations": len(commands),
+        "errors": errors,
+        "seconds": elapsed,
+        "ops_per_second": len(commands) / elapsed if elapsed else 0,
+        "latency_us": latency,
+        "peak_rss": max_rss(),
+    }
+
+
+def timed_step(step) -> dict:
+    start = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - start
+    return {"operations": 1, "seconds": elapsed, "ops_per_second": 1 / elapsed if elapsed else 0, "peak_rss": max_rss()}
+
+
+def run_size(size: int, seed: int, iterations: int, storage: str, compact=False) -> dict:
+    directory = tempfile.mkdtemp(prefix="bot-benchmark-")
+    try:
+        bot.interactive = False
+        bot.registry.root = directory
+        bot.registry.storage = storage
+        bot.registry.compact = compact
+        data = Dataset(size, seed, directory)
+        cases = {}
+        current_session.set(bot.registry.get())
+        cases["import"] = bench([f"import {data.csv} csv"])
+        cases["import"]["ops_per_second"] = size / cases["import"]["seconds"]
+        cases["note"] = bench([f"note {note}" for note in data.notes])
+        cases["save"] = timed_step(bot.save_all)
+        bot.registry.close()
+
+        def load():
+            session = bot.registry.get()
+            session.phonebook
+            session.notebook
+            current_session.set(session)
+
+        cases["load"] = timed_step(load)
+        for label, divisor, make in READ_CASES:
+            cases[label] = bench([make(data) for _ in range(max(iterations // divisor, 3))])
+        for label, make in WRITE_CASES:
+            cases[label] = bench([make(data, i) for i in range(iterations)])
+        cases["save changed"] = timed_step(bot.save_all)
+        bot.registry.close()
+        return {
+            "size": size,
+            "notes": len(data.notes),
+            "hashtags": len(data.tags),
+            "storage": storage,
+            "compact": compact,
+            "peak_rss": max_rss(),
+            "cases": cases,
+        }
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def previous_results(directory: str):
+    files = sorted(glob.glob(os.path.join(directory, "*.json")))
+    return files[-1] if files else None
+
+
+def compare(previous: dict, current: dict, threshold: float):
+    runs = {(run["size"], run["storage"], run.get("compact", False)): run for run in previous["runs"]}
+    for run in current["runs"]:
+        old = runs.get((run["size"], run["storage"], run["compact"]))
+        if old is None:
+            continue
+        for label, case in run["cases"].items():
+            before = old["cases"].get(label)
+            if not before or not before["ops_per_second"]:
+                continue
+            ratio = case["ops_per_second"] / before["ops_per_second"]
+            mark = "  REGRESSION" if ratio < 1 - threshold else "  faster" if ratio > 1 + threshold else ""
+            yield f"{run['size']:>8} {label:<18} {before['ops_per_second']:>12.1f} -> {case['ops_per_second']:>12.1f} ops/s  x{ratio:.2f}{mark}"
+
+
+def report(run: dict):
+    yield f"{run['size']} contacts, {run['notes']} notes, {run['hashtags']} hashtags ({run['storage']}{', compact' if run['compact'] else ''}), peak RSS {run['peak_rss'] / 2 ** 20:.0f} MiB"
+    for label, case in run["cases"].items():
+        latency = case.get("latency_us")
+        line = f"  {label:<18} {case['operations']:>7} ops {case['ops_per_second']:>12.1f} ops/s"
+        if latency:
+            line += f"  p50 {latency['p50'] / 1000:>9.3f} ms  p99 {latency['p99'] / 1000:>9.3f} ms"
+        if case.get("errors"):
+            line += f"  {case['errors']} errors"
+        yield line
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Time every bot command on seeded synthetic books")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="contact counts, e.g. 10000 100000 1000000")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per cheap command, scans run fewer")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--compact", action="store_true", help="keep contacts in packed columns")
+    parser.add_argument("--output", help=f"results file, a new timestamped file in {RESULTS_DIR}/ by default")
+    parser.add_argument("--baseline", help="results to compare with, the latest file in the results directory by default")
+    parser.add_argument("--threshold", type=float, default=0.2, help="throughput change reported as a regression")
+    options = parser.parse_args(argv)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    baseline = options.baseline or previous_results(RESULTS_DIR)
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "seed": options.seed,
+        "iterations": options.iterations,
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "skipped": SKIPPED,
+        "runs": [],
+    }
+    for size in options.sizes:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            run = pool.submit(run_size, size, options.seed, options.iterations, options.storage, options.compact).result()
+        results["runs"].append(run)
+        print("\n".join(report(run)))
+
+    output = options.output or os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results saved to {output}")
+
+    if baseline and os.path.abspath(baseline) != os.path.abspath(output):
+        with open(baseline, encoding="utf-8") as file:
+            previous = json.load(file)
+        print(f"Compared with {baseline}:")
+        print("\n".join(compare(previous, results, options.threshold)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import random
+import resource
+import string
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from classes_for_addressbook import AddressBook, Record, Name, Phone, Email, Birthday, ColumnarRecords
+from classes_for_notebook import Notebook, RecordNote, Hashtag, Note
+
+
+def generate_records(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    for i in range(count):
+        name = "".join(rnd.choice(string.ascii_letters) for _ in range(8)) + "".join(
+            string.ascii_lowercase[int(digit)] for digit in str(i)
+        )
+        record = Record(Name(name), phone=Phone("0" + "".join(rnd.choice(string.digits) for _ in range(9))))
+        if rnd.random() < 0.3:
+            record.add_phone(Phone("380" + "".join(rnd.choice(string.digits) for _ in range(9))))
+        if rnd.random() < 0.7:
+            record.add_email(Email(f"{name.lower()}@example.com"))
+        if rnd.random() < 0.8:
+            record.add_birthday(Birthday(f"{rnd.randint(1, 28):02}.{rnd.randint(1, 12):02}.{rnd.randint(1950, 2010)}"))
+        yield record
+
+
+def generate_notes(count: int, seed: int = 42):
+    rnd = random.Random(seed)
+    tags = [f"#tag{i}" for i in range(max(count // 50, 5))]
+    words = ["meeting", "project", "buy", "call", "review", "draft", "deadline", "idea", "follow", "up"]
+    for _ in range(count):
+        text = " ".join(rnd.choice(words) for _ in range(rnd.randint(5, 30)))
+        yield text, rnd.sample(tags, rnd.randint(1, 5))
+
+
+def max_rss() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class DictField:
+    def __init__(self, value) -> None:
+        self._value = value
+
+
+class DictRecord:
+    def __init__(self, record: Record) -> None:
+        self.name = DictField(record.name.value)
+        self.birthday = DictField(record.birthday.value) if record.birthday else None
+        self.phones = [DictField(phone.value) for phone in record.phones]
+        self.emails = [DictField(email.value) for email in record.emails]
+
+
+def measure(layout: str, count: int) -> tuple[int, float]:
+    storage = ColumnarRecords() if layout == "columnar" else {}
+    baseline = max_rss()
+    start = time.perf_counter()
+    for record in generate_records(count):
+        storage[record.get_name()] = DictRecord(record) if layout == "dicts" else record
+    elapsed = time.perf_counter() - start
+    return max_rss() - baseline, elapsed
+
+
+def measure_book(compact: bool, count: int) -> tuple[int, float]:
+    book = AddressBook(compact=compact)
+    baseline = max_rss()
+    start = time.perf_counter()
+    for record in generate_records(count):
+        book.add_record(record)
+    elapsed = time.perf_counter() - start
+    return max_rss() - baseline, elapsed
+
+
+def measure_notes(shared: bool, count: int) -> tuple[int, float]:
+    notebook = Notebook()
+    baseline = max_rss()
+    start = time.perf_counter()
+    for text, tags in generate_notes(count):
+        note = Note(text)
+        for tag in tags:
+            record = notebook.data.get(tag)
+            if record is None:
+                notebook.add_record(RecordNote(Hashtag(tag), note=note if shared else text))
+            else:
+                record.add_note(note if shared else text)
+    elapsed = time.perf_counter() - start
+    return max_rss() - baseline, elapsed
+
+
+def report(measure_function, label: str, flag, count: int, unit: str) -> None:
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        size, elapsed = pool.submit(measure_function, flag, count).result()
+    print(f"{label:>9}: {count} {unit}s, {size / 2 ** 20:.1f} MiB, {size / count:.0f} B/{unit}, {elapsed:.1f}s")
+
+
+def main(count: int) -> None:
+    report(measure, "dicts", "dicts", count, "contact")
+    report(measure, "slotted", "slotted", count, "contact")
+    report(measure, "columnar", "columnar", count, "contact")
+    report(measure_book, "book", False, count, "contact")
+    report(measure_book, "compact", True, count, "contact")
+    report(measure_notes, "copies", False, count // 10, "note")
+    report(measure_notes, "shared", True, count // 10, "note")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -1,32 +1,57 @@
-from pathlib import Path
-from classes_for_addressbook import Record, AddressBook, Name, Email, Birthday, Phone
-from classes_for_notebook import Notebook, RecordNote, Hashtag
-from sort_dir import sort_dir
+import startup
+import json
+import sys
+from functools import wraps
+from itertools import chain
+from datetime import datetime, date
+from classes_for_addressbook import Record, Name, Email, Birthday, Phone, canonical_phone
+from classes_for_notebook import RecordNote, Hashtag, Note
+from indexes import CURSOR_PREFIX, encode_cursor, is_cursor
+from abstract import ConsoleUserView
+from query import run_query
+from dispatch import CommandTable
+from sessions import BookRegistry, CurrentBook, current_session
+
+try:
+    import readline
+except ImportError:
+    readline = None
+
+startup.record("import modules", startup.since_start())
+
+registry = BookRegistry()
+phonebook = CurrentBook("phonebook")
+notebook = CurrentBook("notebook")
+view = ConsoleUserView()
+
+
+interactive = True
+metrics = None
+
+ERROR_MESSAGES = {
+    KeyError: "There is no such name",
+    ValueError: None,
+    IndexError: "Enter user name",
+    TypeError: "Incorrect values",
+}
+INPUT_ERRORS = tuple(ERROR_MESSAGES)
 
 
-phonebook = AddressBook()
-notebook = Notebook()
-cashe = ""
+def error_message(error):
+    for kind, message in ERROR_MESSAGES.items():
+        if isinstance(error, kind):
+            return message or str(error)
+    return str(error) or type(error).__name__
 
 
 def input_error(func):
+    @wraps(func)
     def inner(*args, **kwargs):
-        global cashe
         try:
-            result = func(*args, **kwargs)
-            return result
-        except KeyError:
-            print(find_matching_lines(cashe))
-            return "There is no such name"
-        except ValueError as error:
-            print(find_matching_lines(cashe))
-            return str(error)
-        except IndexError:
-            print(find_matching_lines(cashe))
-            return "Enter user name"
-        except TypeError:
-            print(find_matching_lines(cashe))
-            return "Incorrect values"
+            return func(*args, **kwargs)
+        except INPUT_ERRORS as error:
+            print(find_matching_lines(current_session.get().cashe))
+            return error_message(error)
 
     return inner
 
@@ -41,8 +66,14 @@ def unknown_command():
 
 
 def change_command(user_input):
+    words = user_input.split()
+    suggestions = command_table.suggest(" ".join(words[:2]))
+    if len(words) > 1:
+        suggestions += [name for name in command_table.suggest(words[0]) if name not in suggestions]
     while True:
         print(find_matching_lines(user_input))
+        if suggestions:
+            print(f"Did you mean: {', '.join(suggestions)}?")
         choice = input(
             "Unknown command. Do you want to change the command? \n(Yes/No): "
         )
@@ -73,46 +104,43 @@ def help():
         "note note_#hashtag_note - create a note with the specified hashtag(can be specified now or later)\n"
         "change name new_phone index - change the phone number at the specified index (if not specified, the first one will be changed)\n"
         "modify hashtag index new_note - modify the note with the specified hashtag and index\n"
-        "search criteria - search for criteria among emails, phones, and names\n"
+        "search criteria [flag] [limit=N] - search for criteria among names, phones, emails and birthdays (any flag ignores case, limit keeps the best matches)\n"
         "show all - show all contacts\n"
-        "show notes - show all notes\n"
+        "show notes [words] [limit=N] - show all notes, or the best matching notes for all words (join words with OR to match any, only #hashtags shows notes having all of them, misspelled words fall back to the closest matches)\n"
         "phone name - show all phone numbers for the specified name\n"
+        "reverse phone [limit] - show the owners of a phone number, or of all numbers starting with the given digits\n"
         "email name - show all emails for the specified name\n"
-        "hashtag hashtag - displays all notes for the specified hashtag\n"
+        "hashtag hashtag - displays all notes for the specified hashtag (or the closest hashtag if it is misspelled)\n"
+        "tags [prefix] [limit] - show the hashtags starting with prefix, most used first (standard 10)\n"
         "birthday name - show the birthday date with the number of days remaining\n"
-        "birthdays - displays a list of contacts whose birthday is a specified number of days from the current date(standard 7 days)\n"
-        "page page_number number_of_contacts_per_page - show all contacts divided into pages, default is the first page with 3 contacts\n"
-        "notes page_number number_of_hashtags - show all notes divided into pages, default is the first page with all notes of one hashtag\n"
+        "birthdays - displays a list of contacts whose birthday is a specified number of days from the current date(standard 7 days), or between two dates dd.mm.yyyy dd.mm.yyyy\n"
+        "next count - show the next count upcoming birthdays (standard 1)\n"
+        "page page_number/@cursor number_of_contacts_per_page - show all contacts divided into pages, default is the first page with 3 contacts\n"
+        "notes page_number/@cursor number_of_hashtags - show all notes divided into pages, default is the first page with all notes of one hashtag\n"
+        "query conditions - search contacts and notes together: phone:050*, email:@corp.com, name:ann, bday:<30d/>30d/dd.mm, note:word, #tag or plain words, combined with AND/OR/NOT and brackets\n"
+        "find name [flag] - show a contact by name (any flag ignores case and accents, a trailing * completes the name)\n"
+        "import file.csv/file.vcf [csv/vcf] - import contacts from a CSV (name,phones,emails,birthday) or vCard file, merging existing names\n"
         "delete name/#hashtag - clears a contact/hashtag by the specified name/hashtag\n"
+        "save - write the contacts and notes changed since the last save to disk\n"
+        "sessions - show the loaded books with cache hits, misses and evictions\n"
+        "stats - show call counts, errors and latency percentiles per command (start with --metrics)\n"
+        "sort folder [workers] - sort the files of a folder into images, audio, video, documents and archives, moving files on worker threads and unpacking archives in parallel processes\n"
         "exit/good bye/close - shutdown/end program"
     )
 
 
-def find_matching_lines(user_input):
-    matching_lines = []
-    help_text = help()
-
-    if user_input.strip():
-        words = user_input.split()
-        first_word = words[0]
-        second_word = words[1] if len(words) > 1 else None
-
-        for line in help_text.split("\n"):
-            if first_word.lower() in line.lower() and len(first_word) >= 3:
-                line = line.strip()
-                if line:
-                    matching_lines.append(line)
-
-        if not matching_lines and second_word:
-            for line in help_text.split("\n"):
-                if second_word.lower() in line.lower() and len(second_word) >= 3:
-                    line = line.strip()
-                    if line:
-                        matching_lines.append(line)
-
-        if matching_lines:
-            matching_lines.insert(0, "Commands in this context:")
+def lazy_lines(lines, empty_message):
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return empty_message
+    return chain([first], lines)
+
 
+def find_matching_lines(user_input):
+    matching_lines = command_table.help_lines(user_input.split())
+    if matching_lines:
+        matching_lines = ["Commands in this context:", *matching_lines]
     return "\n".join(matching_lines) + "\n"
 
 
@@ -138,7 +166,7 @@ def add_note(note):
     hashtags = extract_hashtags(note)
 
     if not hashtags:
-        user_input = input("Please enter hashtags for the note: ")
+        user_input = input("Please enter hashtags for the note: ") if interactive else ""
         user_input = user_input.strip()
         if not user_input:
             hashtags = ["#untagged"]
@@ -147,7 +175,7 @@ def add_note(note):
             if not hashtags:
                 hashtags = [user_input]
 
-    cleaned_note = remove_hashtags_from_note(note)
+    cleaned_note = Note(remove_hashtags_from_note(note))
 
     for hashtag in hashtags:
         record = notebook.get_records(hashtag)
@@ -192,9 +220,9 @@ def update_user(record, contact_details):
 @input_error
 def del_record(key: str):
     if "#" in key:
-        notebook.data.pop(key)
+        notebook.delete_record(key)
         return f"Record for hashtag {key} was deleted from notebook."
-    phonebook.data.pop(key)
+    phonebook.delete_record(key)
     return f"Record for user {key} was deleted from addressbook."
 
 
@@ -229,42 +257,61 @@ def change_note(hashtag, index, new_note):
 def show_all():
     if not phonebook.data:
         return "The phonebook is empty"
-    result = ""
-    for name in phonebook.data:
-        result += phonebook.show_record(name) + "\n"
-    return result.rstrip()
+    return (phonebook.show_record(name) for name in phonebook.data)
 
 
 @input_error
 def find_user_adressbook(name: str, flag=None):
     if not phonebook.data:
         return "The phonebook is empty"
-    result = ""
-    if flag is None:
+    if flag is None and not name.endswith("*"):
+        if phonebook.get_records(name) is None:
+            return "There is no such name"
         return phonebook.show_record(name)
+    if name.endswith("*"):
+        names = phonebook.complete_names(name[:-1])
     else:
-        name = name.lower()
-        for user in phonebook.data:
-            if name == user.lower():
-                result += phonebook.show_record(user) + "\n"
-        return result.rstrip()
+        names = phonebook.find_names(name)
+    if not names:
+        return "There is no such name"
+    return (phonebook.show_record(user) for user in names)
 
 
 @input_error
-def show_notes(criteria=None):
+def show_notes(*criteria):
     if not notebook.data:
         return "The notebook is empty"
     if not criteria:
-        return str(notebook)
+        return notebook.lines()
+
+    limit = None
+    if criteria[-1].startswith("limit="):
+        limit = int(criteria[-1][len("limit="):])
+        criteria = criteria[:-1]
+    if all(word.startswith("#") for word in criteria):
+        notes = notebook.notes_with_tags(criteria)
+        if not notes:
+            corrected = [
+                hashtag if notebook.get_records(hashtag) else next(iter(notebook.similar_tags(hashtag, 1)), hashtag)
+                for hashtag in criteria
+            ]
+            notes = notebook.notes_with_tags(corrected) if corrected != list(criteria) else []
+            if not notes:
+                return "No notes found with all of " + " ".join(criteria)
+            return chain(
+                [f"Showing notes for {' '.join(corrected)}:"],
+                (f"{note.value} [{' '.join(tags)}]" for note, tags in notes[:limit]),
+            )
+        return (f"{note.value} [{' '.join(tags)}]" for note, tags in notes[:limit])
 
-    records = notebook.search(criteria)
+    criteria = " ".join(criteria)
+    records = notebook.search(criteria, limit)
     if not records:
-        return "No note records found for " + criteria
-
-    result = ""
-    for record in records:
-        result += str(record) + "\n"
-    return result
+        records = notebook.fuzzy_search(criteria, limit)
+        if not records:
+            return "No note records found for " + criteria
+        return chain([f"No exact matches for {criteria}, similar notes:"], (str(record) for record in records))
+    return (str(record) for record in records)
 
 
 @input_error
@@ -272,15 +319,20 @@ def get_note(hashtag):
     if hashtag[0] != "#":
         hashtag = "#" + hashtag
     record = notebook.get_records(hashtag)
-    if record:
-        notes = [f"{note}\n----------------------\n" for note in record.notes]
-        if notes:
-            notes_str = "".join(notes)
-            return f"{hashtag}:\n{notes_str}"
-        else:
-            return f"No notes found for {hashtag}"
+    prefix = ""
+    if not record:
+        similar = notebook.similar_tags(hashtag)
+        if not similar:
+            return "There is no such hashtag"
+        record = notebook.get_records(similar[0])
+        prefix = f"There is no such hashtag, did you mean {', '.join(similar)}?\n"
+        hashtag = similar[0]
+    notes = [f"{note}\n----------------------\n" for note in record.notes]
+    if notes:
+        notes_str = "".join(notes)
+        return f"{prefix}{hashtag}:\n{notes_str}"
     else:
-        return "There is no such hashtag"
+        return f"{prefix}No notes found for {hashtag}"
 
 
 @input_error
@@ -295,25 +347,32 @@ def get_birthday(name):
         return "There is no such name"
 
 
-def remaining_days(days=7):
-    upcoming_birthdays = []
-    result = ""
-    for record in phonebook.data.values():
-        name = record.get_name()
-        birthday = record.get_birthday()
-
-        if birthday is not None:
-            days_left = record.days_to_birthday()
-            if days_left is not None and days_left <= int(days):
-                upcoming_birthdays.append((name, birthday.value, days_left))
-
-    if len(upcoming_birthdays) == 0:
-        result = "No upcoming birthdays in the next few days."
+@input_error
+def remaining_days(days=7, end=None):
+    if end is not None:
+        start = datetime.strptime(days, "%d.%m.%Y").date()
+        end = datetime.strptime(end, "%d.%m.%Y").date()
+        upcoming_birthdays = phonebook.birthdays_between(start, end, date.today())
     else:
-        for name, birthday, days_left in upcoming_birthdays:
-            result += f"{name}: birthday: {birthday} days to birthday: {days_left}\n"
+        upcoming_birthdays = phonebook.upcoming_birthdays(int(days))
+    return lazy_lines(
+        (
+            f"{record.get_name()}: birthday: {record.birthday.value} days to birthday: {days_left}"
+            for record, _, days_left in upcoming_birthdays
+        ),
+        "No upcoming birthdays in the next few days.",
+    )
 
-    return result.rstrip()
+
+@input_error
+def next_birthdays(count=1):
+    return lazy_lines(
+        (
+            f"{record.get_name()}: birthday: {record.birthday.value} days to birthday: {days_left}"
+            for record, _, days_left in phonebook.next_birthdays(int(count))
+        ),
+        "No birthdays found",
+    )
 
 
 @input_error
@@ -347,22 +406,52 @@ def get_email(name):
 
 
 @input_error
-def search_by_criteria(criteria: str, flag=None):
+def search_by_criteria(criteria: str, *options):
+    limit = None
+    if options and options[-1].startswith("limit="):
+        limit = int(options[-1][len("limit="):])
+        options = options[:-1]
     if criteria:
-        result = []
-        result_str = ""
-        for user in phonebook.data:
-            record_str = phonebook.show_record(user)
-            if flag is not None:
-                criteria = criteria.lower()
-                record_str = record_str.lower()
-            if record_str.find(criteria) >= 0:
-                result.append(phonebook.show_record(user))
-        for el in result:
-            result_str += el + "\n"
-        if result == []:
+        records = phonebook.search(criteria, ignore_case=bool(options), limit=limit)
+        if not records:
             return f"No records found for that criteria"
-        return result_str.rstrip()
+        return (phonebook.show_record(record.get_name()) for record in records)
+
+
+@input_error
+def reverse_phone(phone, limit=None):
+    if not canonical_phone(phone, prefix=True):
+        raise ValueError("Enter a phone number or the first digits of one")
+    records = phonebook.owners_of(phone)
+    if records:
+        number = canonical_phone(phone)
+        return (f"{record.get_name()}: {number}" for record in records)
+    return lazy_lines(
+        (
+            f"{record.get_name()}: {number}"
+            for number, records in phonebook.phones_with_prefix(phone, limit=int(limit) if limit else None)
+            for record in records
+        ),
+        "No contacts found for that phone number",
+    )
+
+
+def render_note_record(record):
+    result = f"{record.hashtag}:"
+    if record.notes:
+        notes = "\n".join(
+            [f"{note.value}\n---------------------" for note in record.notes]
+        )
+        result += f"\n\n{notes}"
+    return result
+
+
+def page_lines(lines, footer=None, next_cursor=None):
+    yield from lines
+    if footer:
+        yield footer
+    if next_cursor:
+        yield f"Next page: {next_cursor}"
 
 
 @input_error
@@ -370,29 +459,24 @@ def iteration_note(page=1, count_hashtag=1):
     if not notebook.data:
         return "The notebook is empty"
 
-    page = int(page)
     count_hashtag = int(count_hashtag)
-    start_index = (page - 1) * count_hashtag
-    end_index = start_index + count_hashtag
-
-    records = list(notebook)
-    total_pages = (len(records) + count_hashtag - 1) // count_hashtag
+    if is_cursor(page):
+        records, cursor = notebook.page_after(page, count_hashtag)
+        if not records:
+            return "No more notes"
+        return page_lines(map(render_note_record, records), next_cursor=cursor)
+
+    if not str(page).isdigit():
+        raise ValueError(f"Enter a page number or a cursor starting with {CURSOR_PREFIX}")
+    page = int(page)
+    total_pages = notebook.total_pages(count_hashtag)
 
     if page < 1 or page > total_pages:
         return f"Invalid page number. Please enter a page number between 1 and {total_pages}"
 
-    result = ""
-    for record in records[start_index:end_index]:
-        result += f"{record.hashtag}:\n"
-        if record.notes:
-            notes = "\n".join(
-                [f"{note.value}\n---------------------" for note in record.notes]
-            )
-            result += f"\n{notes}\n"
-
-    result += f"Page {page}/{total_pages}"
-
-    return result.rstrip()
+    records = notebook.page(page, count_hashtag)
+    cursor = encode_cursor(records[-1].get_hashtag()) if page < total_pages else None
+    return page_lines(map(render_note_record, records), f"Page {page}/{total_pages}", cursor)
 
 
 @input_error
@@ -400,28 +484,94 @@ def iteration(page=1, page_size=3):
     if not phonebook.data:
         return "The phonebook is empty"
 
-    page = int(page)
     page_size = int(page_size)
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-
-    records = list(phonebook)
-    total_pages = (len(records) + page_size - 1) // page_size
+    if is_cursor(page):
+        records, cursor = phonebook.page_after(page, page_size)
+        if not records:
+            return "No more contacts"
+        return page_lines(map(str, records), next_cursor=cursor)
+
+    if not str(page).isdigit():
+        raise ValueError(f"Enter a page number or a cursor starting with {CURSOR_PREFIX}")
+    page = int(page)
+    total_pages = phonebook.total_pages(page_size)
 
     if page < 1 or page > total_pages:
         return f"Invalid page number. Please enter a page number between 1 and {total_pages}"
 
-    result = ""
-    for record in records[start_index:end_index]:
-        result += f"{record}\n"
+    records = phonebook.page(page, page_size)
+    cursor = encode_cursor(records[-1].get_name()) if page < total_pages else None
+    return page_lines(map(str, records), f"Page {page}/{total_pages}", cursor)
 
-    result += f"Page {page}/{total_pages}"
 
-    return result.rstrip()
+@input_error
+def import_contacts(filename, format=None):
+    try:
+        report = phonebook.bulk_import(filename, format)
+    except FileNotFoundError:
+        return f"File {filename} not found"
+    return str(report)
+
+
+@input_error
+def show_tags(prefix="", limit=10):
+    tags = notebook.top_tags(prefix, int(limit))
+    if not tags:
+        return "No hashtags found"
+    return "\n".join(f"{hashtag}: {count} notes" for hashtag, count in tags)
+
+
+@input_error
+def query(*words):
+    return lazy_lines(run_query(" ".join(words), phonebook, notebook), "Nothing matches that query")
+
+
+@input_error
+def show_sessions():
+    return (f"{key}: {value}" for key, value in registry.stats().items())
+
+
+def show_stats():
+    if metrics is None:
+        return "Metrics are off, start the bot with --metrics FILE or --trace-memory"
+    return metrics.lines()
+
+
+@input_error
+def save_books():
+    changed = len(phonebook.dirty) + len(notebook.dirty)
+    save_all()
+    return f"Saved {changed} changed records"
+
+
+completion_options = []
+
+
+def complete(text, state):
+    global completion_options
+    if state == 0:
+        words = readline.get_line_buffer()[:readline.get_begidx()].split()
+        if not words:
+            completion_options = [command for command in commands if command.startswith(text.lower())]
+        elif text.startswith("#") or words[0] in ("hashtag", "tags", "modify") or words[:2] == ["show", "notes"]:
+            completion_options = [hashtag for hashtag, _ in notebook.top_tags(text, 20)]
+        else:
+            completion_options = phonebook.complete_names(text, 20)
+    if state < len(completion_options):
+        return completion_options[state]
+    return None
 
 
-def sorting_directory(folder):
-    return sort_dir(Path(folder).resolve())
+@input_error
+def sorting_directory(folder, workers=None):
+    from pathlib import Path
+
+    folder = Path(folder).resolve()
+    if not folder.is_dir():
+        raise ValueError(f"Folder {folder} not found")
+    if workers is not None and (not workers.isdigit() or int(workers) < 1):
+        raise ValueError("Number of workers must be a positive integer")
+    return startup.lazy_import("sort_dir").sort_dir(folder, int(workers) if workers else None)
 
 
 commands = {
@@ -439,7 +589,9 @@ commands = {
     "email": get_email,
     "birthday": get_birthday,
     "birthdays": remaining_days,
+    "next": next_birthdays,
     "search": search_by_criteria,
+    "reverse": reverse_phone,
     "page": iteration,
     "notes": iteration_note,
     "modify": change_note,
@@ -447,58 +599,182 @@ commands = {
     "delete": del_record,
     "hashtag": get_note,
     "sort": sorting_directory,
+    "import": import_contacts,
+    "tags": show_tags,
+    "save": save_books,
+    "query": query,
+    "sessions": show_sessions,
+    "stats": show_stats,
 }
 
-filename1 = "address_book.bin"
-filename2 = "note_book.bin"
+command_table = CommandTable(commands, help().split("\n"))
 
 
 def command_parser(user_input):
-    command, *args = user_input.strip().split(" ")
-    if not command.strip():
-        return unknown_command, args
-    try:
-        handler = commands[command.lower()]
-
-    except KeyError:
-        if args:
-            command_part2, *args = args[0].strip().split(" ", 1)
-            command = command + " " + command_part2
-        handler = commands.get(command.lower())
-        if handler is None:
-            user_input = change_command(user_input)
-            if user_input is None:
-                return unknown_command, args
-            return command_parser(user_input)
-    if command.lower() == "modify":
-        args = [args[0], args[1], " ".join(args[2:])]
-    elif command.lower() == "note":
-        try:
-            args = [" ".join(args)]
-        except IndexError:
-            pass
-    return handler, args
+    while True:
+        words = user_input.strip().split(" ")
+        if not words[0]:
+            return None, unknown_command, []
+        command, handler, args = command_table.resolve(words)
+        if handler is not None:
+            break
+        user_input = change_command(user_input)
+        if user_input is None:
+            return None, unknown_command, []
+    return command, handler, command_args(command, args)
 
 
-def main():
-    phonebook.load_address_book(filename1)
-    notebook.load_notes(filename2)
+def command_args(command, args):
+    if command == "modify":
+        return [args[0], args[1], " ".join(args[2:])]
+    if command == "note":
+        return [" ".join(args)]
+    return args
 
-    while True:
-        user_input = input(">>> ")
 
-        global cashe
-        cashe = user_input
+def call(command, handler, args):
+    if metrics is None:
+        return handler(*args)
+    return metrics.call(command, handler, args)
 
-        handler, args = command_parser(user_input)
-        result = handler(*args)
 
-        if not result:
-            print("Goodbye!")
-            phonebook.save_address_book(filename1)
-            notebook.save_notes(filename2)
-            break
-        print(result)
+@input_error
+def measured(command, handler, args):
+    return metrics.call(command, getattr(handler, "__wrapped__", handler), args)
+
+
+def save_all():
+    current_session.get().save()
+
+
+def run_command(line):
+    words = line.split(" ")
+    command, handler, args = command_table.resolve(words)
+    entry = {"command": command or words[0]}
+    if handler is None:
+        entry["ok"] = False
+        entry["error"] = "Unknown command"
+        entry["suggestions"] = command_table.suggest(" ".join(words[:2]))
+        return entry
+    try:
+        result = call(command, getattr(handler, "__wrapped__", handler), command_args(command, args))
+        if result is not None and not isinstance(result, str):
+            result = "\n".join(result)
+    except Exception as error:
+        entry["ok"] = False
+        entry["error"] = error_message(error)
+        return entry
+    entry["ok"] = True
+    entry["output"] = "Goodbye!" if handler is exit else result or ""
+    return entry
+
+
+def run_batch(lines, out=None, save_every=None):
+    global interactive
+    interactive = False
+    out = out or sys.stdout
+    executed = 0
+    session = current_session.get()
+    session.hold()
+    try:
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = run_command(line)
+            entry["line"] = number
+            out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            executed += 1
+            if commands.get(entry["command"]) is exit:
+                break
+            if save_every and executed % save_every == 0:
+                save_all()
+    finally:
+        session.release()
+    save_all()
+    out.flush()
+    return executed
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Address book and notebook assistant")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--compact", action="store_true", help="keep contacts in packed columns instead of one object per field")
+    parser.add_argument(
+        "--batch", nargs="?", const="-", metavar="FILE",
+        help="run commands from FILE (or stdin) without prompting and print one JSON result per command",
+    )
+    parser.add_argument("--save-every", type=int, metavar="N", help="in batch mode, save after every N commands")
+    parser.add_argument("--serve", action="store_true", help="share the books with clients over TCP, one command per line")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=8, help="threads running commands in server mode")
+    parser.add_argument("--user", help="open the books of this user under users/<user>/ instead of the shared ones")
+    parser.add_argument("--memory-budget", type=int, default=256, metavar="MB", help="evict the least recently used books above this size")
+    parser.add_argument("--metrics", metavar="FILE", help="time every command and write the histograms to FILE on exit, Prometheus text for .prom/.txt, JSON otherwise")
+    parser.add_argument("--trace-memory", action="store_true", help="also record the tracemalloc peak of every command (slow)")
+    parser.add_argument("--profile-startup", action="store_true", help="report import and load times on exit")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    global metrics
+    options = parse_args(argv)
+    if options.metrics or options.trace_memory:
+        from metrics import Metrics
+
+        metrics = Metrics(options.trace_memory)
+    registry.storage = options.storage
+    registry.compact = options.compact
+    registry.budget = options.memory_budget * 1024 * 1024
+
+    try:
+        if options.serve:
+            from server import serve
+
+            serve(sys.modules[__name__], options.host, options.port, options.workers, options.user)
+            return
+
+        session = registry.get(options.user)
+        current_session.set(session)
+        if options.batch is not None:
+            startup.record("ready for commands", startup.since_start())
+            if options.batch == "-":
+                run_batch(sys.stdin, save_every=options.save_every)
+            else:
+                with open(options.batch, encoding="utf-8") as file:
+                    run_batch(file, save_every=options.save_every)
+            return
+
+        if readline is not None:
+            readline.set_completer(complete)
+            readline.set_completer_delims(" \t\n")
+            readline.parse_and_bind("tab: complete")
+
+        session.preload()
+        startup.record("time to prompt", startup.since_start())
+        while True:
+            user_input = input(">>> ")
+            session.cashe = user_input
+
+            command, handler, args = command_parser(user_input)
+            if metrics is None or command is None:
+                result = handler(*args)
+            else:
+                result = measured(command, handler, args)
+
+            if not result:
+                print("Goodbye!")
+                break
+            view.display(result)
+    finally:
+        registry.close()
+        if metrics is not None and options.metrics:
+            metrics.dump(options.metrics)
+        if options.profile_startup:
+            print(startup.report(), file=sys.stderr)
 
 
 if __name__ == "__main__":
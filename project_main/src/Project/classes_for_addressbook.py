@@ -1,11 +1,51 @@
-import pickle, re
-from datetime import datetime
+import pickle, re, heapq, threading, time
+from array import array
+from datetime import datetime, date, timedelta
+from itertools import islice
 from collections import UserDict
+from collections.abc import MutableMapping
+from indexes import NgramIndex, PrefixTrie, BirthdayCalendar, FoldedIndex, SortedKeys, birthday_in_year
+from indexes import encode_cursor, decode_cursor
+from journal import Journal, journal_name, replay, fold_journal
+from snapshot import SegmentedRecords
+from segments import SegmentStore, has_segments
+from importers import ImportReport, batches, parse_birthday, reader_for
+
+
+NON_DIGITS = re.compile(r'\D')
+PHONE_PATTERN = re.compile(r"^(38)?\d{10}$")
+EMAIL_PATTERN = re.compile(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$")
+
+
+def canonical_phone(value: str, prefix=False) -> str:
+    digits = NON_DIGITS.sub('', value)
+    if len(digits) == 12 and digits.startswith("38"):
+        return digits[2:]
+    if prefix and digits.startswith("380"):
+        return digits[2:]
+    return digits
+
 
 class Field:
+    __slots__ = ("_value",)
+
     def __init__(self, value) -> None:
         self.value = value
 
+    @classmethod
+    def restore(cls, value):
+        field = cls.__new__(cls)
+        field._value = value
+        return field
+
+    def __getstate__(self):
+        return {"_value": self._value}
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        self._value = state["_value"]
+
     @property
     def value(self):
         return self._value
@@ -16,6 +56,8 @@ class Field:
 
 
 class Name(Field):
+    __slots__ = ()
+
     def __init__(self, name: str):
         self.value = name
 
@@ -30,6 +72,7 @@ class Name(Field):
 
 
 class Phone(Field):
+    __slots__ = ()
 
     def __init__(self, value) -> None:
         self.value = value
@@ -37,23 +80,29 @@ class Phone(Field):
     @Field.value.setter
     def value(self, value:str):
         if value:
-            number = re.sub(r'\D', '', value)
-            if bool(re.search(r"^(38)?\d{10}$", number)) is not True:
+            number = NON_DIGITS.sub('', value)
+            if PHONE_PATTERN.match(number) is None:
                 raise ValueError("Phone number is invalid! Look for the necessary format phone number in help.")
         Field.value.fset(self, number)
     
+    @property
+    def canonical(self) -> str:
+        return canonical_phone(self.value)
+
     def __repr__(self) -> str:
         return f"Phone({self.value})"
 
 
 class Email(Field):
+    __slots__ = ()
+
     def __init__(self, value) -> None:
         self.value = value
 
     @Field.value.setter
     def value(self, value:str):
         if value:            
-            if bool(re.search(r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$", value)) is not True:
+            if EMAIL_PATTERN.match(value) is None:
                 raise ValueError("Email is invalid! Look for the necessary format email in help.")
         Field.value.fset(self, value)
 
@@ -62,6 +111,8 @@ class Email(Field):
 
 
 class Birthday(Field):
+    __slots__ = ()
+
     def __init__(self, birthday):
         self.value = birthday
 
@@ -78,6 +129,8 @@ class Birthday(Field):
 
 
 class Record:
+    __slots__ = ("name", "birthday", "phones", "emails", "book")
+
     def __init__(
         self,
         name: Name,
@@ -87,6 +140,7 @@ class Record:
     ):
         self.name = name
         self.birthday = birthday
+        self.book = None
 
         self.phones = []
         if phone is not None:
@@ -100,16 +154,19 @@ class Record:
         if isinstance(phone, str):
             phone = self.create_phone(phone)
         self.phones.append(phone)
+        self.changed()
 
     def add_email(self, email: Email | str):
         if isinstance(email, str):
             email = self.create_email(email)
         self.emails.append(email)
+        self.changed()
 
     def add_birthday(self, birthday: Birthday | str):
         if isinstance(birthday, str):
             birthday = self.create_birthday(birthday)
         self.birthday = birthday
+        self.changed()
 
     def create_phone(self, phone: str):
         return Phone(phone)
@@ -124,14 +181,45 @@ class Record:
         for p in self.phones:
             if p.value == old_phone:
                 p.value = new_phone
+                self.changed()
                 return p
 
     def edit_email(self, old_email, new_email):
         for e in self.emails:
             if e.value == old_email:
                 e.value = new_email
+                self.changed()
                 return e
 
+    def changed(self):
+        if self.book is not None:
+            self.book.record_changed(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name.value,
+            "phones": [phone.value for phone in self.phones],
+            "emails": [email.value for email in self.emails],
+            "birthday": self.birthday.value.isoformat() if self.birthday else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Record":
+        record = cls(Name.restore(data["name"]))
+        record.phones = [Phone.restore(phone) for phone in data["phones"]]
+        record.emails = [Email.restore(email) for email in data["emails"]]
+        if data["birthday"]:
+            record.birthday = Birthday.restore(date.fromisoformat(data["birthday"]))
+        return record
+
+    def search_fields(self) -> list[str]:
+        fields = [self.name.value]
+        fields.extend(phone.value for phone in self.phones)
+        fields.extend(email.value for email in self.emails)
+        if self.birthday:
+            fields.append(str(self.birthday.value))
+        return fields
+
     def show(self):
         for inx, p in enumerate(self.phones):
             print(f'{inx}: {p.value}') 
@@ -154,17 +242,36 @@ class Record:
     def get_birthday(self):
         return self.birthday
 
-    def days_to_birthday(self):
+    def days_to_birthday(self, today: date | None = None):
         if self.birthday:
-            today = datetime.today().date()
-            next_birthday = datetime(today.year, self.birthday.value.month, self.birthday.value.day).date()
+            if today is None:
+                today = date.today()
+            born = self.birthday.value
+            next_birthday = birthday_in_year(today.year, born.month, born.day)
             if today > next_birthday:
-                next_birthday = datetime(today.year + 1, self.birthday.value.month, self.birthday.value.day).date()
+                next_birthday = birthday_in_year(today.year + 1, born.month, born.day)
             days_left = (next_birthday - today).days
             return days_left
         else:
             return "No birthday set"
 
+    def __getstate__(self):
+        return {
+            "name": self.name,
+            "birthday": self.birthday,
+            "phones": self.phones,
+            "emails": self.emails,
+        }
+
+    def __setstate__(self, state):
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **state[1]}
+        self.name = state["name"]
+        self.birthday = state["birthday"]
+        self.phones = state["phones"]
+        self.emails = state["emails"]
+        self.book = None
+
     def __str__(self) -> str:
         return f"name: {self.name}: phones: {self.phones} emails: {self.emails} birthday: {self.birthday}"
 
@@ -172,14 +279,465 @@ class Record:
         return f"Record({self.name!r}: {self.phones!r}, {self.emails!r}, {self.birthday!r})"
 
 
+def validate_import_row(row: dict) -> Record:
+    name = row["name"]
+    if not name.isalpha():
+        raise ValueError(f"Name {name!r} is invalid")
+    record = Record(Name.restore(name))
+    for phone in row["phones"]:
+        number = NON_DIGITS.sub('', phone)
+        if PHONE_PATTERN.match(number) is None:
+            raise ValueError(f"Phone {phone!r} is invalid")
+        record.phones.append(Phone.restore(number))
+    for email in row["emails"]:
+        if EMAIL_PATTERN.match(email) is None:
+            raise ValueError(f"Email {email!r} is invalid")
+        record.emails.append(Email.restore(email))
+    if row["birthday"]:
+        record.birthday = Birthday.restore(parse_birthday(row["birthday"]))
+    return record
+
+
+def pack_phone(value: str) -> int:
+    return int("1" + value)
+
+
+def unpack_phone(packed: int) -> str:
+    return str(packed)[1:]
+
+
+class RecordView(Record):
+    __slots__ = ("store", "row")
+
+    def __init__(self, store: "ColumnarRecords", row: int):
+        self.store = store
+        self.row = row
+
+    @property
+    def name(self):
+        return Name.restore(self.store.names[self.row])
+
+    @property
+    def phones(self):
+        return [Phone.restore(phone) for phone in self.store.get_phones(self.row)]
+
+    @property
+    def emails(self):
+        return [Email.restore(email) for email in self.store.emails[self.row]]
+
+    @property
+    def birthday(self):
+        ordinal = self.store.birthdays[self.row]
+        return Birthday.restore(date.fromordinal(ordinal)) if ordinal else None
+
+    @property
+    def book(self):
+        return self.store.book
+
+    @book.setter
+    def book(self, book):
+        pass
+
+    def get_name(self):
+        return self.store.names[self.row]
+
+    def add_phone(self, phone: Phone | str):
+        if isinstance(phone, str):
+            phone = self.create_phone(phone)
+        self.store.set_phones(self.row, self.store.get_phones(self.row) + [phone.value])
+        self.changed()
+
+    def add_email(self, email: Email | str):
+        if isinstance(email, str):
+            email = self.create_email(email)
+        self.store.emails[self.row] += (email.value,)
+        self.changed()
+
+    def add_birthday(self, birthday: Birthday | str):
+        if isinstance(birthday, str):
+            birthday = self.create_birthday(birthday)
+        self.store.birthdays[self.row] = birthday.value.toordinal() if birthday else 0
+        self.changed()
+
+    def edit_phone(self, old_phone, new_phone):
+        phones = self.store.get_phones(self.row)
+        if old_phone in phones:
+            phone = Phone(new_phone)
+            phones[phones.index(old_phone)] = phone.value
+            self.store.set_phones(self.row, phones)
+            self.changed()
+            return phone
+
+    def edit_email(self, old_email, new_email):
+        emails = list(self.store.emails[self.row])
+        if old_email in emails:
+            email = Email(new_email)
+            emails[emails.index(old_email)] = email.value
+            self.store.emails[self.row] = tuple(emails)
+            self.changed()
+            return email
+
+    def __reduce__(self):
+        return Record, (self.name,), Record.__getstate__(self)
+
+
+class ColumnarRecords(MutableMapping):
+    def __init__(self) -> None:
+        self.names = []
+        self.rows = {}
+        self.free_rows = []
+        self.phone_values = array("q")
+        self.phone_offsets = array("l")
+        self.phone_counts = array("B")
+        self.emails = []
+        self.birthdays = array("l")
+        self.book = None
+
+    def get_phones(self, row: int) -> list[str]:
+        start = self.phone_offsets[row]
+        return [unpack_phone(packed) for packed in self.phone_values[start:start + self.phone_counts[row]]]
+
+    def set_phones(self, row: int, phones: list[str]) -> None:
+        if len(phones) > self.phone_counts[row]:
+            self.phone_offsets[row] = len(self.phone_values)
+            self.phone_values.extend(pack_phone(phone) for phone in phones)
+        else:
+            start = self.phone_offsets[row]
+            for i, phone in enumerate(phones):
+                self.phone_values[start + i] = pack_phone(phone)
+        self.phone_counts[row] = len(phones)
+
+    def __getitem__(self, name: str) -> RecordView:
+        return RecordView(self, self.rows[name])
+
+    def __setitem__(self, name: str, record: Record) -> None:
+        phones = [phone.value for phone in record.phones]
+        emails = tuple(email.value for email in record.emails)
+        birthday = record.birthday.value.toordinal() if record.birthday else 0
+        row = self.rows.get(name)
+        if row is None:
+            if self.free_rows:
+                row = self.free_rows.pop()
+            else:
+                row = len(self.names)
+                self.names.append(None)
+                self.phone_offsets.append(0)
+                self.phone_counts.append(0)
+                self.emails.append(())
+                self.birthdays.append(0)
+            self.rows[name] = row
+        self.names[row] = name
+        self.set_phones(row, phones)
+        self.emails[row] = emails
+        self.birthdays[row] = birthday
+
+    def pop(self, name: str, *default):
+        if name not in self.rows and default:
+            return default[0]
+        view = self[name]
+        record = Record.from_dict(view.to_dict())
+        del self[name]
+        return record
+
+    def __delitem__(self, name: str) -> None:
+        row = self.rows.pop(name)
+        self.names[row] = None
+        self.phone_counts[row] = 0
+        self.emails[row] = ()
+        self.birthdays[row] = 0
+        self.free_rows.append(row)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["book"] = None
+        return state
+
+
+def columnar(records) -> ColumnarRecords:
+    columns = ColumnarRecords()
+    for key, record in records.items():
+        columns[key] = record
+    return columns
+
+
 class AddressBook(UserDict):
-    def __init__(self, record: Record | None = None) -> None:
-        self.data = {}
+    def __init__(self, record: Record | None = None, compact=False) -> None:
+        self.data = ColumnarRecords() if compact else {}
+        if compact:
+            self.data.book = self
+        self.ngrams = NgramIndex()
+        self.phone_owners = {}
+        self.phone_trie = PrefixTrie()
+        self.phones_by_name = {}
+        self.calendar = BirthdayCalendar()
+        self.folded_names = FoldedIndex()
+        self.ordered_names = SortedKeys()
+        self.indexed = True
+        self.index_lock = threading.Lock()
+        self.journal = None
+        self.journal_snapshot = None
+        self.compactor = None
+        self.store = None
+        self.dirty = {}
         if record is not None:
             self.add_record(record)
 
     def add_record(self, record: Record):
+        record.book = self
         self.data[record.get_name()] = record
+        self.dirty[record.get_name()] = None
+        self.index_record(record)
+        self.log_put(record)
+
+    def delete_record(self, name: str) -> Record:
+        record = self.data.pop(name)
+        self.dirty[name] = None
+        self.unindex_record(name)
+        self.log({"op": "delete", "key": name})
+        record.book = None
+        return record
+
+    def record_changed(self, record: Record):
+        if not isinstance(self.data, dict) and not isinstance(record, RecordView):
+            self.data[record.get_name()] = record
+        self.dirty[record.get_name()] = None
+        self.index_record(record)
+        self.log_put(record)
+
+    def log(self, entry: dict):
+        if self.journal is not None and self.journal.append(entry):
+            self.compact_journal()
+
+    def log_put(self, record: Record):
+        if self.journal is not None:
+            self.log({"op": "put", "key": record.get_name(), "value": record.to_dict()})
+
+    def hold(self):
+        if self.journal is not None:
+            self.journal.hold()
+
+    def release(self):
+        if self.journal is not None:
+            self.journal.release()
+
+    def open_journal(self, filename):
+        name = journal_name(filename)
+        replayed = False
+        for entry in replay(name):
+            self.apply_entry(self.data, entry)
+            self.dirty[entry["key"]] = None
+            replayed = True
+        if replayed and self.indexed:
+            self.reindex()
+        self.journal = Journal(name)
+        self.journal_snapshot = filename
+
+    def compact_journal(self):
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        rotated = self.journal.rotate()
+        self.compactor = threading.Thread(
+            target=fold_journal,
+            args=(self.journal_snapshot, rotated, self.read_snapshot, self.apply_entry, self.write_snapshot),
+            daemon=True,
+        )
+        self.compactor.start()
+
+    @staticmethod
+    def apply_entry(data, entry: dict):
+        if entry["op"] == "put":
+            data[entry["key"]] = Record.from_dict(entry["value"])
+        elif entry["op"] == "delete":
+            data.pop(entry["key"], None)
+
+    @staticmethod
+    def read_snapshot(filename):
+        if has_segments(filename):
+            return SegmentStore(filename).records()
+        try:
+            with open(filename, 'rb') as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def write_snapshot(data, filename):
+        SegmentStore(filename).write_all(data)
+
+    def ensure_indexes(self):
+        if not self.indexed:
+            with self.index_lock:
+                if not self.indexed:
+                    self.reindex()
+
+    def index_record(self, record: Record, force=False):
+        if not self.indexed and not force:
+            return
+        name = record.get_name()
+        self.folded_names.add(name)
+        self.ordered_names.add(name)
+        self.ngrams.add(name, record.search_fields())
+        self.unindex_phones(name)
+        phones = {phone.canonical for phone in record.phones}
+        for phone in phones:
+            self.phone_owners.setdefault(phone, set()).add(name)
+            self.phone_trie.add(phone, name)
+        self.phones_by_name[name] = phones
+        if record.birthday:
+            self.calendar.add(name, record.birthday.value.month, record.birthday.value.day)
+        else:
+            self.calendar.remove(name)
+
+    def unindex_record(self, name: str):
+        if not self.indexed:
+            return
+        self.folded_names.remove(name)
+        self.ordered_names.remove(name)
+        self.ngrams.remove(name)
+        self.unindex_phones(name)
+        self.calendar.remove(name)
+
+    def unindex_phones(self, name: str):
+        for phone in self.phones_by_name.pop(name, ()):
+            owners = self.phone_owners[phone]
+            owners.discard(name)
+            if not owners:
+                del self.phone_owners[phone]
+            self.phone_trie.remove(phone, name)
+
+    def reindex(self):
+        if isinstance(self.data, (ColumnarRecords, SegmentedRecords)):
+            self.data.book = self
+        self.ngrams = NgramIndex()
+        self.phone_owners = {}
+        self.phone_trie = PrefixTrie()
+        self.phones_by_name = {}
+        self.calendar = BirthdayCalendar()
+        self.folded_names = FoldedIndex()
+        self.ordered_names = SortedKeys(self.data)
+        for record in self.data.values():
+            record.book = self
+            self.index_record(record, force=True)
+        self.indexed = True
+
+    def search(self, criteria: str, ignore_case=False, limit=None) -> list[Record]:
+        self.ensure_indexes()
+        names = self.ngrams.candidates(criteria)
+        if names is None:
+            names = self.data.keys()
+        if ignore_case:
+            criteria = criteria.lower()
+        ranked = []
+        for name in names:
+            record = self.data[name]
+            for rank, field in enumerate(record.search_fields()):
+                if ignore_case:
+                    field = field.lower()
+                position = field.find(criteria)
+                if position >= 0:
+                    ranked.append((min(rank, 1), position, name))
+                    break
+        if limit is not None:
+            ranked = heapq.nsmallest(int(limit), ranked)
+        else:
+            ranked.sort()
+        return [self.data[name] for _, _, name in ranked]
+
+    def owners_of(self, phone: str) -> list[Record]:
+        self.ensure_indexes()
+        names = self.phone_owners.get(canonical_phone(phone), ())
+        return [self.data[name] for name in sorted(names)]
+
+    def phones_with_prefix(self, prefix: str, limit=None):
+        self.ensure_indexes()
+        for phone, names in self.phone_trie.prefixed(canonical_phone(prefix, prefix=True), limit):
+            yield phone, [self.data[name] for name in sorted(names)]
+
+    def birthdays_between(self, start: date, end: date, today: date | None = None):
+        self.ensure_indexes()
+        if today is None:
+            today = start
+        for birthday, name in self.calendar.between(start, end):
+            yield self.data[name], birthday, (birthday - today).days
+
+    def upcoming_birthdays(self, days=7, today: date | None = None):
+        if today is None:
+            today = date.today()
+        return self.birthdays_between(today, today + timedelta(days=int(days)), today)
+
+    def next_birthdays(self, count=1, today: date | None = None):
+        seen = set()
+        upcoming = (
+            item for item in self.upcoming_birthdays(366, today)
+            if not (item[0].get_name() in seen or seen.add(item[0].get_name()))
+        )
+        return islice(upcoming, int(count))
+
+    def total_pages(self, page_size: int) -> int:
+        self.ensure_indexes()
+        return self.ordered_names.total_pages(page_size)
+
+    def page(self, number: int, page_size: int) -> list[Record]:
+        self.ensure_indexes()
+        return [self.data[name] for name in self.ordered_names.page(number, page_size)]
+
+    def page_after(self, cursor: str | None, page_size: int):
+        self.ensure_indexes()
+        if cursor:
+            names = self.ordered_names.after(decode_cursor(cursor), page_size)
+        else:
+            names = self.ordered_names.page(1, page_size)
+        next_cursor = None
+        if names and self.ordered_names.after(names[-1], 1):
+            next_cursor = encode_cursor(names[-1])
+        return [self.data[name] for name in names], next_cursor
+
+    def bulk_import(self, source, format=None, batch_size=1000) -> ImportReport:
+        if isinstance(source, str):
+            if format is None:
+                format = source.rsplit(".", 1)[-1]
+            reader_for(format)
+            with open(source, encoding="utf-8", newline="") as file:
+                return self.bulk_import(file, format, batch_size)
+        reader = reader_for(format or "csv")
+        report = ImportReport()
+        start = time.perf_counter()
+        for batch in batches(reader(source), batch_size):
+            records = []
+            for line, row in batch:
+                report.rows += 1
+                try:
+                    records.append(validate_import_row(row))
+                except ValueError as error:
+                    report.errors.append((line, str(error)))
+            for record in records:
+                existing = self.get_records(record.get_name())
+                if existing is None:
+                    self.add_record(record)
+                    report.added += 1
+                else:
+                    self.merge_record(existing, record)
+                    report.merged += 1
+        report.seconds = time.perf_counter() - start
+        return report
+
+    def merge_record(self, record: Record, other: Record):
+        phones = {phone.value for phone in record.phones}
+        for phone in other.phones:
+            if phone.value not in phones:
+                record.add_phone(phone)
+        emails = {email.value for email in record.emails}
+        for email in other.emails:
+            if email.value not in emails:
+                record.add_email(email)
+        if other.birthday and (record.birthday is None or record.birthday.value != other.birthday.value):
+            record.add_birthday(other.birthday)
 
     def show(self):
         for name, record in self.data.items():
@@ -192,11 +750,37 @@ class AddressBook(UserDict):
         except KeyError:
             return None
 
-    def save_address_book(self, filename):
-        with open(filename, 'wb') as file:
-            pickle.dump(self.data, file)
+    def find_names(self, name: str) -> list[str]:
+        self.ensure_indexes()
+        return sorted(self.folded_names.get(name))
+
+    def complete_names(self, prefix: str, limit=None) -> list[str]:
+        self.ensure_indexes()
+        return list(self.folded_names.complete(prefix, limit))
 
-    def show_record(self, name: str) -> str:    
+    def save_address_book(self, filename):
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+            self.store = SegmentStore(self.journal_snapshot)
+        compact = isinstance(self.data, ColumnarRecords)
+        if self.store is None or self.store.filename != filename:
+            self.store = SegmentStore(filename)
+            self.store.compact = compact
+            self.store.write_all(self.data)
+        elif self.store.needs_rewrite(len(self.data)) or self.store.compact != compact:
+            self.store.compact = compact
+            self.store.write_all(self.data)
+        else:
+            self.store.save(self.data, self.dirty)
+        self.dirty.clear()
+        if isinstance(self.data, SegmentedRecords) and self.data.parts is not self.store.readers:
+            self.data = self.store.records()
+            self.data.book = self
+        if self.journal is not None and filename == self.journal_snapshot:
+            self.journal.reset()
+
+    def show_record(self, name: str, today: date | None = None) -> str:
             result = ''
             record = self.get_records(name)
             result += f'{name}:'
@@ -208,16 +792,28 @@ class AddressBook(UserDict):
                 result += f' emails: {emails}'
             if record.birthday:
                 result += f' birthday: {record.birthday.value}'
-                days_left = record.days_to_birthday()
+                days_left = record.days_to_birthday(today)
                 result += f' days to birthday: {days_left}'
             return result
 
     def load_address_book(self, filename):
+        if has_segments(filename):
+            compact = isinstance(self.data, ColumnarRecords)
+            self.store = SegmentStore(filename)
+            self.data = self.store.records()
+            if self.store.compact or compact:
+                self.data = columnar(self.data)
+            self.data.book = self
+            self.indexed = False
+            self.dirty.clear()
+            return
         try:
             with open(filename, 'rb') as file:
-                self.data = pickle.load(file)
+                records = pickle.load(file)
+            self.data = columnar(records) if isinstance(self.data, ColumnarRecords) else records
         except FileNotFoundError:
             pass
+        self.reindex()
 
     def __iter__(self):
         return iter(self.data.values())
@@ -1,6 +1,11 @@
 import pickle
+import threading
+from bisect import bisect_left
 from collections import UserDict
 import re
+from indexes import SortedKeys, InvertedIndex, PrefixTrie, BKTree, tokenize, typo_bound, intersect_sorted, encode_cursor, decode_cursor
+from journal import Journal, journal_name, replay, fold_journal
+from segments import SegmentStore, has_segments
 
 
 class Field:
@@ -38,31 +43,55 @@ class Hashtag(Field):
 
 
 class Note(Field):
-    def __init__(self, value):
+    id = None
+
+    def __init__(self, value, id=None):
         super().__init__(value)
+        self.id = id
 
 
 class RecordNote:
     def __init__(self, hashtag, note=None):
         self.hashtag = hashtag
         self.notes = []
+        self.book = None
         if note is not None:
             self.add_note(note)
 
     def add_note(self, note):
         if isinstance(note, str):
-            self.notes.append(Note(note))
-        elif isinstance(note, Note):
-            self.notes.append(note)
-        else:
+            note = Note(note)
+        elif not isinstance(note, Note):
             raise ValueError("New note is not string value or Note() object")
+        self.notes.append(note)
+        if self.book is not None:
+            self.book.note_added(self, note)
 
     def edit_note(self, old_note, new_note):
         for note in self.notes:
             if note.value == old_note:
                 note.value = new_note
+                self.changed(note)
                 return note
 
+    def changed(self, note=None):
+        if self.book is not None:
+            self.book.record_changed(self, note)
+
+    def to_dict(self):
+        return {
+            "hashtag": self.get_hashtag(),
+            "notes": [note.value for note in self.notes],
+            "ids": [note.id for note in self.notes],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        record = cls(Hashtag(data["hashtag"]))
+        ids = data.get("ids") or [None] * len(data["notes"])
+        record.notes = [Note(note, id) for note, id in zip(data["notes"], ids)]
+        return record
+
     def show(self):
         result = []
         for note in self.notes:
@@ -88,6 +117,15 @@ class RecordNote:
             result += ": " + ", ".join([note.value for note in self.notes])
         return result
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("book", None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.book = None
+
     def __repr__(self):
         if self.notes:
             notes_list=', '.join([note.value for note in self.notes])
@@ -98,11 +136,256 @@ class Notebook(UserDict):
     def __init__(self, record=None):
         super().__init__()
         self.data = {}
+        self.ordered_tags = SortedKeys()
+        self.text_index = InvertedIndex()
+        self.notes = {}
+        self.note_tags = {}
+        self.tag_postings = {}
+        self.tag_trie = PrefixTrie()
+        self.tag_spelling = BKTree()
+        self.next_note_id = 1
+        self.journal = None
+        self.journal_snapshot = None
+        self.compactor = None
+        self.store = None
+        self.dirty = {}
         if record is not None:
             self.add_record(record)
 
     def add_record(self, record):
+        record.book = self
         self.data[record.get_hashtag()] = record
+        self.ordered_tags.add(record.get_hashtag())
+        self.record_changed(record)
+
+    def delete_record(self, hashtag):
+        record = self.data.pop(hashtag)
+        self.dirty[hashtag] = None
+        self.ordered_tags.remove(hashtag)
+        self.unindex_notes(hashtag)
+        self.log({"op": "delete", "key": hashtag})
+        record.book = None
+        return record
+
+    def record_changed(self, record, note=None):
+        if note is None or note.id not in self.notes:
+            self.index_notes(record)
+            self.dirty[record.get_hashtag()] = None
+            self.log_put(record)
+            return
+        self.index_text(note.id)
+        for hashtag in self.note_tags[note.id]:
+            self.dirty[hashtag] = None
+            self.log({"op": "edit", "key": hashtag, "value": {"note": note.value, "id": note.id}})
+
+    def note_added(self, record, note):
+        hashtag = record.get_hashtag()
+        if hashtag not in self.tag_postings:
+            self.record_changed(record)
+            return
+        canonical = self.register_note(note)
+        if canonical is not note:
+            record.notes[-1] = canonical
+        postings = self.tag_postings[hashtag]
+        i = bisect_left(postings, canonical.id)
+        if i == len(postings) or postings[i] != canonical.id:
+            postings.insert(i, canonical.id)
+            self.count_tag(hashtag)
+        self.note_tags.setdefault(canonical.id, set()).add(hashtag)
+        self.index_text(canonical.id)
+        self.dirty[hashtag] = None
+        if self.journal is not None:
+            self.log({"op": "append", "key": hashtag, "value": {"note": canonical.value, "id": canonical.id}})
+
+    def register_note(self, note):
+        if note.id is None:
+            note.id = self.next_note_id
+            self.next_note_id += 1
+        return self.notes.setdefault(note.id, note)
+
+    def index_notes(self, record):
+        hashtag = record.get_hashtag()
+        record.notes = [self.register_note(note) for note in record.notes]
+        ids = sorted({note.id for note in record.notes})
+        previous = set(self.tag_postings.get(hashtag, ()))
+        for note_id in previous - set(ids):
+            self.release_note(note_id, hashtag)
+        self.tag_postings[hashtag] = ids
+        for note_id in ids:
+            if note_id not in previous:
+                self.note_tags.setdefault(note_id, set()).add(hashtag)
+                self.index_text(note_id)
+        self.count_tag(hashtag)
+
+    def index_text(self, note_id):
+        note = self.notes.get(note_id)
+        if note is None:
+            self.text_index.remove(note_id)
+            return
+        tokens = tokenize(note.value)
+        for hashtag in self.note_tags.get(note_id, ()):
+            tokens.extend(tokenize(hashtag))
+        self.text_index.add(note_id, tokens)
+
+    def unindex_notes(self, hashtag):
+        for note_id in self.tag_postings.pop(hashtag, ()):
+            self.release_note(note_id, hashtag)
+        self.tag_trie.remove(self.tag_word(hashtag), hashtag)
+        self.forget_tag_word(hashtag)
+
+    def forget_tag_word(self, hashtag):
+        word = self.tag_word(hashtag)
+        if not self.tag_trie.get(word):
+            self.tag_spelling.remove(word)
+
+    @staticmethod
+    def tag_word(hashtag):
+        return hashtag.lstrip("#").lower()
+
+    def count_tag(self, hashtag):
+        count = len(self.tag_postings.get(hashtag, ()))
+        if count:
+            self.tag_trie.add(self.tag_word(hashtag), hashtag, count)
+            self.tag_spelling.add(self.tag_word(hashtag))
+        else:
+            self.tag_trie.remove(self.tag_word(hashtag), hashtag)
+            self.forget_tag_word(hashtag)
+
+    def similar_tags(self, hashtag, limit=5):
+        word = self.tag_word(hashtag)
+        found = []
+        for distance, match in self.tag_spelling.search(word, typo_bound(word)):
+            for tag in self.tag_trie.get(match):
+                found.append((distance, -len(self.tag_postings.get(tag, ())), tag))
+        return [tag for _, _, tag in sorted(found)[:limit]]
+
+    def top_tags(self, prefix="", limit=10):
+        return [(hashtag, count) for _, hashtag, count in self.tag_trie.top(self.tag_word(prefix), limit)]
+
+    def release_note(self, note_id, hashtag):
+        tags = self.note_tags[note_id]
+        tags.discard(hashtag)
+        if not tags:
+            del self.note_tags[note_id]
+            del self.notes[note_id]
+        self.index_text(note_id)
+
+    def notes_with_tags(self, hashtags):
+        postings = sorted((self.tag_postings.get(hashtag, []) for hashtag in hashtags), key=len)
+        if not postings:
+            return []
+        ids = postings[0]
+        for other in postings[1:]:
+            ids = intersect_sorted(ids, other)
+        return [(self.notes[note_id], sorted(self.note_tags[note_id])) for note_id in ids]
+
+    def all_notes(self):
+        return list(self.notes.values())
+
+    def tags_of(self, note):
+        return sorted(self.note_tags.get(note.id, ()))
+
+    def reindex(self):
+        self.ordered_tags = SortedKeys(self.data)
+        self.text_index = InvertedIndex()
+        self.notes = {}
+        self.note_tags = {}
+        self.tag_postings = {}
+        self.tag_trie = PrefixTrie()
+        self.tag_spelling = BKTree()
+        self.next_note_id = 1 + max(
+            (note.id for record in self.data.values() for note in record.notes if note.id is not None),
+            default=0,
+        )
+        for record in self.data.values():
+            record.book = self
+            self.index_notes(record)
+
+    def log(self, entry):
+        if self.journal is not None and self.journal.append(entry):
+            self.compact_journal()
+
+    def log_put(self, record):
+        if self.journal is not None:
+            self.log({"op": "put", "key": record.get_hashtag(), "value": record.to_dict()})
+
+    def hold(self):
+        self.tag_spelling.hold()
+        self.text_index.spelling.hold()
+        if self.journal is not None:
+            self.journal.hold()
+
+    def release(self):
+        self.tag_spelling.release()
+        self.text_index.spelling.release()
+        if self.journal is not None:
+            self.journal.release()
+
+    def open_journal(self, filename):
+        name = journal_name(filename)
+        for entry in replay(name):
+            self.apply_entry(self.data, entry)
+            self.dirty[entry["key"]] = None
+        self.reindex()
+        self.journal = Journal(name)
+        self.journal_snapshot = filename
+
+    def compact_journal(self):
+        if self.compactor is not None and self.compactor.is_alive():
+            return
+        rotated = self.journal.rotate()
+        self.compactor = threading.Thread(
+            target=fold_journal,
+            args=(self.journal_snapshot, rotated, self.read_snapshot, self.apply_entry, self.write_snapshot),
+            daemon=True,
+        )
+        self.compactor.start()
+
+    @staticmethod
+    def apply_entry(data, entry):
+        if entry["op"] == "put":
+            data[entry["key"]] = RecordNote.from_dict(entry["value"])
+        elif entry["op"] == "append":
+            record = data.get(entry["key"]) or RecordNote(Hashtag(entry["key"]))
+            if all(note.id != entry["value"]["id"] for note in record.notes):
+                record.notes.append(Note(entry["value"]["note"], entry["value"]["id"]))
+            data[entry["key"]] = record
+        elif entry["op"] == "edit":
+            for note in data[entry["key"]].notes if entry["key"] in data else ():
+                if note.id == entry["value"]["id"]:
+                    note.value = entry["value"]["note"]
+        elif entry["op"] == "delete":
+            data.pop(entry["key"], None)
+
+    @staticmethod
+    def read_snapshot(filename):
+        if has_segments(filename):
+            return SegmentStore(filename).load()
+        try:
+            with open(filename, "rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return {}
+
+    @staticmethod
+    def write_snapshot(data, filename):
+        SegmentStore(filename).write_all(data)
+
+    def total_pages(self, page_size):
+        return self.ordered_tags.total_pages(page_size)
+
+    def page(self, number, page_size):
+        return [self.data[tag] for tag in self.ordered_tags.page(number, page_size)]
+
+    def page_after(self, cursor, page_size):
+        if cursor:
+            tags = self.ordered_tags.after(decode_cursor(cursor), page_size)
+        else:
+            tags = self.ordered_tags.page(1, page_size)
+        next_cursor = None
+        if tags and self.ordered_tags.after(tags[-1], 1):
+            next_cursor = encode_cursor(tags[-1])
+        return [self.data[tag] for tag in tags], next_cursor
 
     def show(self):
         for hashtag, record in self.data.items():
@@ -113,28 +396,54 @@ class Notebook(UserDict):
         return self.data.get(hashtag)
 
     def save_notes(self, filename):
-        with open(filename, "wb") as file:
-            pickle.dump(self.data, file)
+        if self.compactor is not None:
+            self.compactor.join()
+            self.compactor = None
+            self.store = SegmentStore(self.journal_snapshot)
+        if self.store is None or self.store.filename != filename:
+            self.store = SegmentStore(filename)
+            self.store.write_all(self.data)
+        elif self.store.needs_rewrite(len(self.data)):
+            self.store.write_all(self.data)
+        else:
+            self.store.save(self.data, self.dirty)
+        self.dirty.clear()
+        if self.journal is not None and filename == self.journal_snapshot:
+            self.journal.reset()
 
     def load_notes(self, filename):
-        try:
-            with open(filename, "rb") as file:
-                self.data = pickle.load(file)
-        except FileNotFoundError:
-            pass
-
-    def search(self, value: str):
-        result_by_note = []
-        result_by_tag = []
-        for tag, record in self.data.items():
-            if value in tag:
-                result_by_tag.append(record)
-                continue
-            for note in record.notes:
-                if value in note.value:
-                    result_by_note.append(record)
-                    break
-        return result_by_tag + result_by_note
+        if has_segments(filename):
+            self.store = SegmentStore(filename)
+            self.data = self.store.load()
+        else:
+            try:
+                with open(filename, "rb") as file:
+                    self.data = pickle.load(file)
+            except FileNotFoundError:
+                pass
+        self.dirty.clear()
+        self.reindex()
+
+    def search(self, value: str, limit=None):
+        words = value.split()
+        mode = "or" if "OR" in words else "and"
+        terms = tokenize(" ".join(word for word in words if word not in ("AND", "OR")))
+        return self.ranked_records(terms, mode, limit)
+
+    def fuzzy_search(self, value: str, limit=None):
+        terms = []
+        for term in tokenize(" ".join(word for word in value.split() if word not in ("AND", "OR"))):
+            terms.extend(self.text_index.correct(term))
+        return self.ranked_records(terms, "or", limit)
+
+    def ranked_records(self, terms, mode, limit=None):
+        wanted = limit
+        while True:
+            ranked = self.text_index.search(terms, mode, wanted)
+            hashtags = dict.fromkeys(tag for _, note_id in ranked for tag in sorted(self.note_tags[note_id]))
+            if not limit or len(hashtags) >= limit or len(ranked) < wanted:
+                return [self.data[tag] for tag in list(hashtags)[:limit]]
+            wanted *= 2
 
     def __iter__(self):
         return iter(self.data.values())
@@ -147,8 +456,9 @@ class Notebook(UserDict):
         else:
             raise StopIteration
 
+    def lines(self):
+        for record in self.data.values():
+            yield str(record)
+
     def __str__(self):
-        result = ""
-        for tag in self.data:
-            result += str(self.data[tag]) + "\n"
-        return result
+        return "".join(line + "\n" for line in self.lines())
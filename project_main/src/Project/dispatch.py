@@ -0,0 +1,57 @@
+import difflib
+import re
+
+KEYWORD_PATTERN = re.compile(r"[a-z]+")
+
+
+class CommandTable:
+    def __init__(self, commands: dict, help_lines) -> None:
+        self.names = list(commands)
+        self.trie = {}
+        for name, handler in commands.items():
+            node = self.trie
+            for word in name.split():
+                node = node.setdefault(word, {})
+            node[None] = (name, handler)
+        self.help_index = {}
+        for line in help_lines:
+            line = line.strip()
+            if not line:
+                continue
+            keys = set()
+            for keyword in KEYWORD_PATTERN.findall(line.lower()):
+                keys.update(keyword[:end] for end in range(3, len(keyword) + 1))
+            for key in keys:
+                self.help_index.setdefault(key, []).append(line)
+        self.suggestions = {}
+
+    def resolve(self, words: list[str]):
+        node = self.trie
+        found = None
+        for depth, word in enumerate(words):
+            node = node.get(word.lower())
+            if node is None:
+                break
+            if None in node:
+                found = node[None], depth + 1
+        if found is None:
+            return None, None, words
+        (name, handler), used = found
+        return name, handler, words[used:]
+
+    def help_lines(self, words: list[str]) -> list[str]:
+        for word in words[:2]:
+            lines = self.help_index.get(word.lower()) if len(word) >= 3 else None
+            if lines:
+                return lines
+        return []
+
+    def suggest(self, command: str) -> list[str]:
+        command = command.lower()
+        suggestions = self.suggestions.get(command)
+        if suggestions is None:
+            if len(self.suggestions) >= 1024:
+                self.suggestions.clear()
+            suggestions = difflib.get_close_matches(command, self.names, n=3, cutoff=0.6)
+            self.suggestions[command] = suggestions
+        return suggestions
@@ -0,0 +1,99 @@
+import csv
+from datetime import datetime
+from itertools import islice
+
+
+class ImportReport:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.added = 0
+        self.merged = 0
+        self.errors = []
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self) -> str:
+        lines = [
+            f"Imported {self.rows} rows: {self.added} added, {self.merged} merged, "
+            f"{len(self.errors)} errors in {self.seconds:.2f}s ({self.rows_per_second:.0f} rows/s)"
+        ]
+        for line, message in self.errors[:20]:
+            lines.append(f"row {line}: {message}")
+        if len(self.errors) > 20:
+            lines.append(f"... and {len(self.errors) - 20} more errors")
+        return "\n".join(lines)
+
+
+def split_values(value: str | None) -> list[str]:
+    if not value:
+        return []
+    return [item.strip() for item in value.replace("|", ";").split(";") if item.strip()]
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    if "name" not in {field.strip().lower() for field in reader.fieldnames or () if field}:
+        raise ValueError("The CSV file needs a name column, e.g. name,phones,emails,birthday")
+    for line, row in enumerate(reader, start=2):
+        row = {key.strip().lower(): value for key, value in row.items() if key}
+        yield line, {
+            "name": (row.get("name") or "").strip(),
+            "phones": split_values(row.get("phones") or row.get("phone")),
+            "emails": split_values(row.get("emails") or row.get("email")),
+            "birthday": (row.get("birthday") or "").strip() or None,
+        }
+
+
+def read_vcard(lines):
+    card = None
+    start = 0
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        field, _, value = line.partition(":")
+        field = field.split(";")[0].upper()
+        if field == "BEGIN":
+            card = {"name": "", "phones": [], "emails": [], "birthday": None}
+            start = line_number
+        elif card is None:
+            continue
+        elif field == "END":
+            yield start, card
+            card = None
+        elif field == "FN":
+            card["name"] = value.strip()
+        elif field == "TEL":
+            card["phones"].append(value.strip())
+        elif field == "EMAIL":
+            card["emails"].append(value.strip())
+        elif field == "BDAY":
+            card["birthday"] = value.strip()
+
+
+READERS = {"csv": read_csv, "vcf": read_vcard, "vcard": read_vcard}
+
+
+def reader_for(format: str):
+    reader = READERS.get(format.lower())
+    if reader is None:
+        raise ValueError(f"Unknown import format {format}, use {', '.join(READERS)}")
+    return reader
+
+
+def parse_birthday(value: str):
+    for pattern in ("%d.%m.%Y", "%Y-%m-%d", "%Y%m%d"):
+        try:
+            return datetime.strptime(value, pattern).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Birthday {value!r} is invalid")
+
+
+def batches(rows, size: int):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
@@ -0,0 +1,550 @@
+import base64
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from calendar import isleap
+from collections import defaultdict
+from datetime import date
+
+
+class NgramIndex:
+    def __init__(self, n: int = 3) -> None:
+        self.n = n
+        self.postings = defaultdict(set)
+        self.grams_by_key = {}
+
+    def grams(self, text: str) -> set:
+        text = text.lower()
+        return {text[i:i + self.n] for i in range(len(text) - self.n + 1)}
+
+    def add(self, key, fields) -> None:
+        self.remove(key)
+        grams = set()
+        for field in fields:
+            grams |= self.grams(field)
+        for gram in grams:
+            self.postings[gram].add(key)
+        self.grams_by_key[key] = grams
+
+    def remove(self, key) -> None:
+        grams = self.grams_by_key.pop(key, None)
+        if not grams:
+            return
+        for gram in grams:
+            keys = self.postings[gram]
+            keys.discard(key)
+            if not keys:
+                del self.postings[gram]
+
+    def candidates(self, query: str) -> set | None:
+        grams = self.grams(query)
+        if not grams:
+            return None
+        result = None
+        for gram in sorted(grams, key=lambda g: len(self.postings.get(g, ()))):
+            keys = self.postings.get(gram)
+            if not keys:
+                return set()
+            result = set(keys) if result is None else result & keys
+            if not result:
+                break
+        return result
+
+
+def intersect_sorted(first: list, second: list) -> list:
+    if len(first) > len(second):
+        first, second = second, first
+    result = []
+    i = 0
+    for item in first:
+        i = bisect_left(second, item, i)
+        if i == len(second):
+            break
+        if second[i] == item:
+            result.append(item)
+    return result
+
+
+def fold(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+
+
+class FoldedIndex:
+    def __init__(self) -> None:
+        self.keys_by_fold = {}
+        self.sorted_folds = []
+
+    def add(self, key: str) -> None:
+        folded = fold(key)
+        keys = self.keys_by_fold.get(folded)
+        if keys is None:
+            keys = self.keys_by_fold[folded] = set()
+            insort(self.sorted_folds, folded)
+        keys.add(key)
+
+    def remove(self, key: str) -> None:
+        folded = fold(key)
+        keys = self.keys_by_fold.get(folded)
+        if keys is None:
+            return
+        keys.discard(key)
+        if not keys:
+            del self.keys_by_fold[folded]
+            del self.sorted_folds[bisect_left(self.sorted_folds, folded)]
+
+    def get(self, key: str) -> set:
+        return self.keys_by_fold.get(fold(key), set())
+
+    def complete(self, prefix: str, limit=None):
+        prefix = fold(prefix)
+        i = bisect_left(self.sorted_folds, prefix)
+        while i < len(self.sorted_folds) and self.sorted_folds[i].startswith(prefix):
+            for key in sorted(self.keys_by_fold[self.sorted_folds[i]]):
+                yield key
+                if limit is not None:
+                    limit -= 1
+                    if limit <= 0:
+                        return
+            i += 1
+
+
+CURSOR_PREFIX = "@"
+
+
+def is_cursor(value) -> bool:
+    return isinstance(value, str) and value.startswith(CURSOR_PREFIX)
+
+
+def encode_cursor(key: str) -> str:
+    return CURSOR_PREFIX + base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> str:
+    if not is_cursor(cursor):
+        raise ValueError("Invalid page cursor")
+    cursor = cursor[len(CURSOR_PREFIX):]
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return base64.b64decode(padded, altchars=b"-_", validate=True).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid page cursor")
+
+
+class SortedKeys:
+    def __init__(self, keys=()) -> None:
+        self.keys = sorted(keys)
+
+    def add(self, key) -> None:
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            self.keys.insert(i, key)
+
+    def remove(self, key) -> None:
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            del self.keys[i]
+
+    def page(self, number: int, size: int) -> list:
+        start = (number - 1) * size
+        return self.keys[start:start + size]
+
+    def after(self, key, size: int) -> list:
+        start = bisect_right(self.keys, key)
+        return self.keys[start:start + size]
+
+    def total_pages(self, size: int) -> int:
+        return (len(self.keys) + size - 1) // size
+
+    def prefixed(self, prefix: str):
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            yield self.keys[i]
+            i += 1
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+class TrieNode:
+    __slots__ = ("children", "keys", "count")
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.keys = {}
+        self.count = 0
+
+
+class PrefixTrie:
+    def __init__(self) -> None:
+        self.root = TrieNode()
+
+    def add(self, word: str, key, weight: int = 1) -> None:
+        path = self._path(word, create=True)
+        delta = weight - path[-1].keys.get(key, 0)
+        path[-1].keys[key] = weight
+        for node in path:
+            node.count += delta
+
+    def remove(self, word: str, key) -> None:
+        path = self._path(word)
+        if path is None or key not in path[-1].keys:
+            return
+        weight = path[-1].keys.pop(key)
+        for node in path:
+            node.count -= weight
+        for parent, char, node in zip(path, word, path[1:]):
+            if node.count == 0:
+                del parent.children[char]
+                break
+
+    def get(self, word: str) -> set:
+        path = self._path(word)
+        return set(path[-1].keys) if path else set()
+
+    def count(self, prefix: str) -> int:
+        path = self._path(prefix)
+        return path[-1].count if path else 0
+
+    def prefixed(self, prefix: str, limit=None):
+        path = self._path(prefix)
+        if path is None:
+            return
+        stack = [(prefix, path[-1])]
+        while stack:
+            word, node = stack.pop()
+            if node.keys:
+                yield word, set(node.keys)
+                if limit is not None:
+                    limit -= 1
+                    if limit <= 0:
+                        return
+            for char in sorted(node.children, reverse=True):
+                stack.append((word + char, node.children[char]))
+
+    def top(self, prefix: str, limit: int):
+        path = self._path(prefix)
+        if path is None:
+            return
+        heap = [(-path[-1].count, prefix, 1, path[-1])]
+        while heap and limit > 0:
+            count, word, kind, item = heapq.heappop(heap)
+            if kind == 0:
+                yield word, item, -count
+                limit -= 1
+                continue
+            for key, weight in item.keys.items():
+                heapq.heappush(heap, (-weight, word, 0, key))
+            for char, child in item.children.items():
+                heapq.heappush(heap, (-child.count, word + char, 1, child))
+
+    def _path(self, word: str, create=False):
+        node = self.root
+        path = [node]
+        for char in word:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = node.children[char] = TrieNode()
+            node = child
+            path.append(node)
+        return path
+
+
+def edit_distance(first: str, second: str, bound: int | None = None) -> int:
+    if len(first) < len(second):
+        first, second = second, first
+    if bound is not None and len(first) - len(second) > bound:
+        return bound + 1
+    before = None
+    previous = list(range(len(second) + 1))
+    for i, a in enumerate(first, 1):
+        current = [i]
+        for j, b in enumerate(second, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a != b))
+            if i > 1 and j > 1 and a == second[j - 2] and first[i - 2] == b:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if bound is not None and min(current) > bound and min(previous) > bound:
+            return bound + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def typo_bound(word: str) -> int:
+    if len(word) <= 2:
+        return 0
+    return 1 if len(word) <= 5 else 2
+
+
+def closest_words(term: str, words, limit: int = 3) -> list[str]:
+    bound = typo_bound(term)
+    found = []
+    for word in words:
+        distance = edit_distance(term, word, bound)
+        if distance <= bound:
+            found.append((distance, word))
+    if not found:
+        return []
+    best = min(found)[0]
+    return sorted(word for distance, word in found if distance == best)[:limit]
+
+
+PENDING_WORDS = 256
+
+
+class BKNode:
+    __slots__ = ("word", "children")
+
+    def __init__(self, word: str) -> None:
+        self.word = word
+        self.children = {}
+
+
+class BKTree:
+    def __init__(self, words=()) -> None:
+        self.root = None
+        self.live = set()
+        self.pending = set()
+        self.dead = set()
+        self.held = False
+        for word in words:
+            self.add(word)
+
+    def add(self, word: str) -> None:
+        if word in self.dead:
+            self.dead.discard(word)
+            self.live.add(word)
+        elif word not in self.live:
+            self.live.add(word)
+            self.pending.add(word)
+            if len(self.pending) >= PENDING_WORDS and not self.held:
+                self.flush()
+
+    def insert(self, word: str) -> None:
+        if self.root is None:
+            self.root = BKNode(word)
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(word, node.word)
+            if distance == 0:
+                return
+            child = node.children.get(distance)
+            if child is None:
+                node.children[distance] = BKNode(word)
+                return
+            node = child
+
+    def hold(self) -> None:
+        self.held = True
+
+    def release(self) -> None:
+        self.held = False
+
+    def flush(self) -> None:
+        pending, self.pending = self.pending, set()
+        for word in pending:
+            self.insert(word)
+
+    def remove(self, word: str) -> None:
+        if word not in self.live:
+            return
+        self.live.discard(word)
+        if word in self.pending:
+            self.pending.discard(word)
+            return
+        self.dead.add(word)
+        if len(self.dead) > len(self.live):
+            held = self.held
+            self.__init__(list(self.live))
+            self.held = held
+
+    def search(self, word: str, max_distance: int, limit=None) -> list:
+        if len(self.pending) >= PENDING_WORDS and not self.held:
+            self.flush()
+        found = []
+        for candidate in self.pending:
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                found.append((distance, candidate))
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(word, node.word)
+            if distance <= max_distance and node.word in self.live:
+                found.append((distance, node.word))
+            for gap, child in node.children.items():
+                if distance - max_distance <= gap <= distance + max_distance:
+                    stack.append(child)
+        found.sort()
+        return found[:limit] if limit else found
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.live
+
+    def __len__(self) -> int:
+        return len(self.live)
+
+
+TOKEN_PATTERN = re.compile(r"#?\w+")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        if token.startswith("#"):
+            tokens.append(token[1:])
+    return tokens
+
+
+class InvertedIndex:
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self) -> None:
+        self.postings = defaultdict(dict)
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0
+        self.vocabulary = SortedKeys()
+        self.spelling = BKTree()
+
+    def add(self, doc, tokens: list[str]) -> None:
+        self.remove(doc)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for term, count in counts.items():
+            if term not in self.postings:
+                self.vocabulary.add(term)
+                self.spelling.add(term)
+            self.postings[term][doc] = count
+        self.terms[doc] = set(counts)
+        self.lengths[doc] = len(tokens)
+        self.total_length += len(tokens)
+
+    def remove(self, doc) -> None:
+        length = self.lengths.pop(doc, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.terms.pop(doc):
+            docs = self.postings[term]
+            del docs[doc]
+            if not docs:
+                del self.postings[term]
+                self.vocabulary.remove(term)
+                self.spelling.remove(term)
+
+    def expand(self, term: str) -> list[str]:
+        if term in self.postings:
+            return [term]
+        return list(self.vocabulary.prefixed(term))
+
+    def correct(self, term: str, limit: int = 3) -> list[str]:
+        matches = self.spelling.search(term, typo_bound(term))
+        if not matches:
+            return []
+        best = matches[0][0]
+        return [word for distance, word in matches if distance == best][:limit]
+
+    def idf(self, term: str) -> float:
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.lengths) - df + 0.5) / (df + 0.5))
+
+    def score(self, term: str, doc, idf: float, average: float) -> float:
+        tf = self.postings[term].get(doc, 0)
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / average)
+        return idf * tf * (self.k1 + 1) / (tf + norm)
+
+    def search(self, terms: list[str], mode="and", limit=None) -> list:
+        if not terms or not self.lengths:
+            return []
+        average = self.total_length / len(self.lengths) or 1
+        groups = [self.expand(term) for term in terms]
+        if mode == "and":
+            if not all(groups):
+                return []
+            sets = sorted(
+                (
+                    self.postings[group[0]].keys() if len(group) == 1 else set().union(*(self.postings[term] for term in group))
+                    for group in groups
+                ),
+                key=len,
+            )
+            candidates = set(sets[0]).intersection(*sets[1:])
+            weights = [(self.postings[term], self.idf(term)) for term in {term for group in groups for term in group}]
+            k1, b = self.k1, self.b
+            scored = []
+            for doc in candidates:
+                norm = k1 * (1 - b + b * self.lengths[doc] / average)
+                score = 0.0
+                for docs, idf in weights:
+                    tf = docs.get(doc)
+                    if tf:
+                        score += idf * tf * (k1 + 1) / (tf + norm)
+                scored.append((score, doc))
+            return heapq.nlargest(limit, scored) if limit else sorted(scored, reverse=True)
+        all_terms = sorted(
+            {term for group in groups for term in group}, key=self.idf, reverse=True
+        )
+        bounds = [self.idf(term) * (self.k1 + 1) for term in all_terms]
+        remaining = sum(bounds)
+        scores = {}
+        for term, bound in zip(all_terms, bounds):
+            remaining -= bound
+            idf = self.idf(term)
+            admit = True
+            if limit and len(scores) >= limit:
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+                admit = threshold < remaining + bound
+            for doc in self.postings[term]:
+                if admit or doc in scores:
+                    scores[doc] = scores.get(doc, 0.0) + self.score(term, doc, idf, average)
+        scored = [(score, doc) for doc, score in scores.items()]
+        return heapq.nlargest(limit, scored) if limit else sorted(scored, reverse=True)
+
+
+def birthday_in_year(year: int, month: int, day: int) -> date:
+    if month == 2 and day == 29 and not isleap(year):
+        return date(year, 2, 28)
+    return date(year, month, day)
+
+
+class BirthdayCalendar:
+    def __init__(self) -> None:
+        self.entries = []
+        self.days_by_key = {}
+
+    def add(self, key, month: int, day: int) -> None:
+        self.remove(key)
+        insort(self.entries, (month, day, key))
+        self.days_by_key[key] = (month, day)
+
+    def remove(self, key) -> None:
+        month_day = self.days_by_key.pop(key, None)
+        if month_day is None:
+            return
+        entry = (*month_day, key)
+        del self.entries[bisect_left(self.entries, entry)]
+
+    def between(self, start: date, end: date):
+        while start <= end:
+            year = start.year
+            last = min(end, date(year, 12, 31))
+            low = (start.month, start.day)
+            high = (last.month, last.day + 1)
+            if not isleap(year) and low <= (2, 28) < high:
+                high = max(high, (2, 30))
+            for i in range(bisect_left(self.entries, low), bisect_left(self.entries, high)):
+                month, day, key = self.entries[i]
+                yield birthday_in_year(year, month, day), key
+            start = date(year + 1, 1, 1)
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,131 @@
+import json
+import os
+import threading
+import time
+
+
+def journal_name(filename: str) -> str:
+    return f"{filename}.journal"
+
+
+def write_atomic(filename: str, data: bytes) -> None:
+    temp = f"{filename}.tmp"
+    with open(temp, "wb") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, filename)
+
+
+def committed_lines(filename: str):
+    try:
+        with open(filename, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    return
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    return
+                yield entry, len(line)
+    except FileNotFoundError:
+        return
+
+
+def read_entries(filename: str):
+    for entry, _ in committed_lines(filename):
+        yield entry
+
+
+def replay(filename: str):
+    yield from read_entries(f"{filename}.old")
+    yield from read_entries(filename)
+
+
+def fold_journal(snapshot: str, rotated: str, load, apply, dump) -> None:
+    data = load(snapshot)
+    for entry in read_entries(rotated):
+        apply(data, entry)
+    dump(data, snapshot)
+    os.remove(rotated)
+
+
+class Journal:
+    def __init__(self, filename: str, batch_size=64, interval=1.0, compact_after=10_000) -> None:
+        self.filename = filename
+        self.batch_size = batch_size
+        self.interval = interval
+        self.compact_after = compact_after
+        self.lock = threading.Lock()
+        self.entries = 0
+        end = 0
+        for _, size in committed_lines(filename):
+            self.entries += 1
+            end += size
+        self.pending = 0
+        self.held = False
+        self.last_sync = time.monotonic()
+        self.file = open(filename, "a", encoding="utf-8")
+        self.file.truncate(end)
+
+    def append(self, entry: dict) -> bool:
+        with self.lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.entries += 1
+            self.pending += 1
+            if self.held:
+                return self.entries >= self.compact_after
+            self.file.flush()
+            if self.pending >= self.batch_size or time.monotonic() - self.last_sync >= self.interval:
+                self._sync()
+            return self.entries >= self.compact_after
+
+    def hold(self) -> None:
+        with self.lock:
+            self.held = True
+
+    def release(self) -> None:
+        with self.lock:
+            self.held = False
+            self._sync()
+
+    def sync(self) -> None:
+        with self.lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        if self.pending:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_sync = time.monotonic()
+
+    def rotate(self) -> str:
+        rotated = f"{self.filename}.old"
+        with self.lock:
+            self._sync()
+            self.file.close()
+            if os.path.exists(rotated):
+                with open(rotated, "a", encoding="utf-8") as old, open(self.filename, encoding="utf-8") as new:
+                    old.write(new.read())
+                os.remove(self.filename)
+            else:
+                os.replace(self.filename, rotated)
+            self.file = open(self.filename, "a", encoding="utf-8")
+            self.entries = 0
+        return rotated
+
+    def reset(self) -> None:
+        with self.lock:
+            self.file.close()
+            for filename in (f"{self.filename}.old", self.filename):
+                if os.path.exists(filename):
+                    os.remove(filename)
+            self.file = open(self.filename, "a", encoding="utf-8")
+            self.entries = 0
+            self.pending = 0
+
+    def close(self) -> None:
+        with self.lock:
+            self._sync()
+            self.file.close()
@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from collections.abc import Iterator
+
+from journal import write_atomic
+
+SUB_BUCKETS = 32
+QUANTILES = (0.5, 0.9, 0.99)
+
+
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @staticmethod
+    def bucket(value: int) -> int:
+        shift = max(value.bit_length() - 6, 0)
+        return shift * SUB_BUCKETS + (value >> shift)
+
+    @staticmethod
+    def bounds(bucket: int):
+        shift = max(bucket // SUB_BUCKETS - 1, 0)
+        mantissa = bucket - shift * SUB_BUCKETS
+        return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+    def record(self, value: int) -> None:
+        value = max(int(value), 0)
+        bucket = self.bucket(value)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.min = value if self.min is None else min(self.min, value)
+
+    def percentile(self, quantile: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(quantile * self.count, 1)
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(self.bounds(bucket)[1], self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        summary = {
+            "count": self.count,
+            "min": self.min or 0,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else 0,
+        }
+        for quantile in QUANTILES:
+            summary[f"p{quantile * 100:g}"] = self.percentile(quantile)
+        summary["buckets"] = [[self.bounds(bucket)[0], self.counts[bucket]] for bucket in sorted(self.counts)]
+        return summary
+
+
+class CommandStats:
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.memory = Histogram()
+
+
+class Metrics:
+    def __init__(self, trace_memory=False) -> None:
+        self.trace_memory = trace_memory
+        self.commands = {}
+        self.lock = threading.Lock()
+        if trace_memory:
+            import tracemalloc
+
+            self.tracemalloc = tracemalloc
+            tracemalloc.start()
+
+    def call(self, command: str, handler, args):
+        baseline = self.memory_baseline()
+        start = time.perf_counter()
+        try:
+            result = handler(*args)
+        except BaseException:
+            self.record(command, time.perf_counter() - start, True, baseline)
+            raise
+        elapsed = time.perf_counter() - start
+        if isinstance(result, Iterator):
+            return self.timed_lines(command, result, elapsed, baseline)
+        self.record(command, elapsed, False, baseline)
+        return result
+
+    def timed_lines(self, command: str, lines, elapsed: float, baseline):
+        failed = True
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    line = next(lines)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    break
+                elapsed += time.perf_counter() - start
+                try:
+                    yield line
+                except GeneratorExit:
+                    failed = False
+                    raise
+            failed = False
+        finally:
+            self.record(command, elapsed, failed, baseline)
+
+    def memory_baseline(self):
+        if not self.trace_memory:
+            return None
+        self.tracemalloc.reset_peak()
+        return self.tracemalloc.get_traced_memory()[0]
+
+    def record(self, command: str, seconds: float, failed: bool, baseline) -> None:
+        peak = None if baseline is None else self.tracemalloc.get_traced_memory()[1] - baseline
+        with self.lock:
+            stats = self.commands.get(command)
+            if stats is None:
+                stats = self.commands[command] = CommandStats()
+            stats.calls += 1
+            stats.errors += failed
+            stats.latency.record(seconds * 1_000_000)
+            if peak is not None:
+                stats.memory.record(peak)
+
+    def lines(self):
+        yield f"{'command':<12} {'calls':>7} {'errors':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}" + (
+            f" {'peak KiB':>9}" if self.trace_memory else ""
+        )
+        with self.lock:
+            rows = sorted(self.commands.items(), key=lambda item: -item[1].latency.total)
+            for command, stats in rows:
+                latency = stats.latency
+                line = f"{command:<12} {stats.calls:>7} {stats.errors:>6}" + "".join(
+                    f" {value / 1000:>9.3f}"
+                    for value in (latency.percentile(0.5), latency.percentile(0.9), latency.percentile(0.99), latency.max)
+                )
+                if self.trace_memory:
+                    line += f" {stats.memory.max / 1024:>9.1f}"
+                yield line
+
+    def to_json(self) -> str:
+        with self.lock:
+            data = {
+                command: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "latency_us": stats.latency.summary(),
+                    **({"peak_bytes": stats.memory.summary()} if self.trace_memory else {}),
+                }
+                for command, stats in self.commands.items()
+            }
+        return json.dumps(data, indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP bot_command_seconds Wall time spent in a command handler.",
+            "# TYPE bot_command_seconds summary",
+        ]
+        errors = [
+            "# HELP bot_command_errors_total Command calls that raised an error.",
+            "# TYPE bot_command_errors_total counter",
+        ]
+        memory = [
+            "# HELP bot_command_peak_bytes Peak traced allocation while a command ran.",
+            "# TYPE bot_command_peak_bytes summary",
+        ]
+        with self.lock:
+            for command, stats in sorted(self.commands.items()):
+                label = 'command="{}"'.format(command.replace("\\", "\\\\").replace('"', '\\"'))
+                for quantile in QUANTILES:
+                    value = stats.latency.percentile(quantile) / 1_000_000
+                    lines.append(f'bot_command_seconds{{{label},quantile="{quantile}"}} {value:.6f}')
+                lines.append(f"bot_command_seconds_sum{{{label}}} {stats.latency.total / 1_000_000:.6f}")
+                lines.append(f"bot_command_seconds_count{{{label}}} {stats.calls}")
+                errors.append(f"bot_command_errors_total{{{label}}} {stats.errors}")
+                if self.trace_memory:
+                    for quantile in QUANTILES:
+                        memory.append(f'bot_command_peak_bytes{{{label},quantile="{quantile}"}} {stats.memory.percentile(quantile)}')
+                    memory.append(f"bot_command_peak_bytes_sum{{{label}}} {stats.memory.total}")
+                    memory.append(f"bot_command_peak_bytes_count{{{label}}} {stats.memory.count}")
+        if self.trace_memory:
+            errors += memory
+        return "\n".join(lines + errors) + "\n"
+
+    def dump(self, filename: str) -> None:
+        text = self.to_prometheus() if filename.endswith((".prom", ".txt")) else self.to_json()
+        write_atomic(filename, text.encode("utf-8"))
@@ -0,0 +1,404 @@
+import re
+from datetime import date, datetime, timedelta
+from fnmatch import fnmatchcase
+
+from classes_for_addressbook import canonical_phone
+from indexes import birthday_in_year, tokenize
+
+QUERY_TOKEN = re.compile(r'\(|\)|"[^"]*"|[^\s()]+')
+DAYS_PATTERN = re.compile(r"([<>])(\d+)d?")
+KEYWORDS = ("AND", "OR", "NOT")
+
+
+class QueryContext:
+    def __init__(self, phonebook, notebook, today: date | None = None) -> None:
+        self.phonebook = phonebook
+        self.notebook = notebook
+        self.today = today or date.today()
+        self.notes = {}
+        self.everything = None
+
+    def contact(self, name: str):
+        return ("contact", name)
+
+    def note(self, note):
+        item = ("note", note.id if note.id is not None else note.value)
+        self.notes.setdefault(item, note)
+        return item
+
+    def record(self, item):
+        return self.phonebook.get_records(item[1])
+
+    def universe(self) -> set:
+        if self.everything is None:
+            self.everything = {self.contact(name) for name in self.phonebook.data}
+            self.everything.update(self.note(note) for note in self.notebook.all_notes())
+        return set(self.everything)
+
+    def size(self) -> int:
+        return len(self.phonebook.data) + len(self.notebook.data)
+
+
+class Predicate:
+    kind = None
+
+    def estimate(self, context: QueryContext) -> int:
+        return context.size()
+
+    def lookup(self, context: QueryContext) -> set:
+        return {item for item in context.universe() if self.matches(context, item)}
+
+    def matches(self, context: QueryContext, item) -> bool:
+        if item[0] == "contact":
+            return self.kind in ("contact", "any") and self.matches_record(context, context.record(item))
+        return self.kind in ("note", "any") and self.matches_note(context, context.notes[item])
+
+    def matches_record(self, context, record) -> bool:
+        return False
+
+    def matches_note(self, context, note) -> bool:
+        return False
+
+
+class PhonePredicate(Predicate):
+    kind = "contact"
+
+    def __init__(self, pattern: str) -> None:
+        self.prefix = pattern.endswith("*") and "*" not in pattern[:-1]
+        self.scan = "*" in pattern and not self.prefix
+        self.pattern = pattern
+        self.digits = canonical_phone(pattern.rstrip("*"), prefix=self.prefix)
+        if not self.scan and not self.digits:
+            raise ValueError(f"Phone pattern {pattern} has no digits")
+
+    def estimate(self, context):
+        if self.scan:
+            return len(context.phonebook.data)
+        context.phonebook.ensure_indexes()
+        if self.prefix:
+            return context.phonebook.phone_trie.count(self.digits)
+        return len(context.phonebook.phone_owners.get(self.digits, ()))
+
+    def lookup(self, context):
+        if self.scan:
+            return super().lookup(context)
+        if self.prefix:
+            return {
+                context.contact(record.get_name())
+                for _, records in context.phonebook.phones_with_prefix(self.digits)
+                for record in records
+            }
+        return {context.contact(record.get_name()) for record in context.phonebook.owners_of(self.digits)}
+
+    def matches_record(self, context, record):
+        for phone in record.phones:
+            if self.scan and fnmatchcase(phone.value, self.pattern):
+                return True
+            canonical = canonical_phone(phone.value)
+            if self.prefix and canonical.startswith(self.digits) or canonical == self.digits:
+                return True
+        return False
+
+
+class TextPredicate(Predicate):
+    def __init__(self, text: str, kind="any", field=None) -> None:
+        self.text = text.lower()
+        self.kind = kind
+        self.field = field
+        self.literal = max(self.text.split("*"), key=len)
+        self.terms = tokenize(self.text.replace("*", " "))
+
+    def values(self, record):
+        if self.field == "name":
+            return [record.name.value]
+        if self.field == "email":
+            return [email.value for email in record.emails]
+        return record.search_fields()
+
+    def matches_value(self, value: str) -> bool:
+        value = value.lower()
+        if "*" in self.text:
+            return fnmatchcase(value, self.text)
+        return self.text in value
+
+    def matches_record(self, context, record):
+        return any(self.matches_value(value) for value in self.values(record))
+
+    def matches_note(self, context, note):
+        tokens = tokenize(note.value)
+        return bool(self.terms) and all(any(token.startswith(term) for token in tokens) for term in self.terms)
+
+    def estimate(self, context):
+        estimate = 0
+        if self.kind in ("contact", "any"):
+            context.phonebook.ensure_indexes()
+            candidates = context.phonebook.ngrams.candidates(self.literal)
+            estimate += len(context.phonebook.data) if candidates is None else len(candidates)
+        if self.kind in ("note", "any"):
+            postings = context.notebook.text_index.postings
+            estimate += min((len(postings.get(term, ())) for term in self.terms), default=0)
+        return estimate
+
+    def lookup(self, context):
+        items = set()
+        if self.kind in ("contact", "any"):
+            for record in context.phonebook.search(self.literal, ignore_case=True):
+                if self.matches_record(context, record):
+                    items.add(context.contact(record.get_name()))
+        if self.kind in ("note", "any") and self.terms:
+            for record in context.notebook.search(" ".join(self.terms)):
+                for note in record.notes:
+                    if self.matches_note(context, note):
+                        items.add(context.note(note))
+        return items
+
+
+class TagPredicate(Predicate):
+    kind = "note"
+
+    def __init__(self, hashtag: str) -> None:
+        self.prefix = hashtag.endswith("*")
+        self.hashtag = hashtag.rstrip("*")
+
+    def hashtags(self, context):
+        if not self.prefix:
+            return [self.hashtag]
+        return [hashtag for hashtag, _ in context.notebook.top_tags(self.hashtag, len(context.notebook.data))]
+
+    def estimate(self, context):
+        if self.prefix:
+            return context.notebook.tag_trie.count(context.notebook.tag_word(self.hashtag))
+        return len(context.notebook.tag_postings.get(self.hashtag, ()))
+
+    def lookup(self, context):
+        return {
+            context.note(note)
+            for hashtag in self.hashtags(context)
+            for note, _ in context.notebook.notes_with_tags([hashtag])
+        }
+
+    def matches_note(self, context, note):
+        tags = context.notebook.tags_of(note)
+        if self.prefix:
+            return any(tag.lower().startswith(self.hashtag.lower()) for tag in tags)
+        return self.hashtag in tags
+
+
+class BirthdayPredicate(Predicate):
+    kind = "contact"
+
+    def __init__(self, spec: str) -> None:
+        match = DAYS_PATTERN.fullmatch(spec)
+        self.day = None
+        if match:
+            self.operator, self.days = match.group(1), int(match.group(2))
+        else:
+            try:
+                self.day = datetime.strptime(f"{spec}.2000", "%d.%m.%Y").date()
+            except ValueError:
+                raise ValueError(f"Birthday filter {spec} is invalid, use <30d, >30d or dd.mm")
+
+    def window(self, context):
+        if self.day is not None:
+            day = birthday_in_year(context.today.year, self.day.month, self.day.day)
+            if day < context.today:
+                day = birthday_in_year(context.today.year + 1, self.day.month, self.day.day)
+            return day, day
+        return context.today, context.today + timedelta(days=self.days - 1)
+
+    def estimate(self, context):
+        context.phonebook.ensure_indexes()
+        total = len(context.phonebook.calendar)
+        if self.day is not None:
+            return total // 366 + 1
+        share = total * min(self.days, 366) // 366 + 1
+        return share if self.operator == "<" else total - share + 1
+
+    def lookup(self, context):
+        if self.day is None and self.operator == ">":
+            return super().lookup(context)
+        start, end = self.window(context)
+        return {
+            context.contact(record.get_name())
+            for record, _, _ in context.phonebook.birthdays_between(start, end, context.today)
+        }
+
+    def matches_record(self, context, record):
+        if not record.birthday:
+            return False
+        days = record.days_to_birthday(context.today)
+        if self.day is not None:
+            born = record.birthday.value
+            return (born.month, born.day) == (self.day.month, self.day.day)
+        return days < self.days if self.operator == "<" else days > self.days
+
+
+FIELDS = {
+    "phone": PhonePredicate,
+    "email": lambda value: TextPredicate(value, "contact", "email"),
+    "name": lambda value: TextPredicate(value, "contact", "name"),
+    "bday": BirthdayPredicate,
+    "birthday": BirthdayPredicate,
+    "note": lambda value: TextPredicate(value, "note"),
+    "text": lambda value: TextPredicate(value, "note"),
+}
+
+
+class Not:
+    def __init__(self, child) -> None:
+        self.child = child
+
+    def estimate(self, context):
+        return max(context.size() - self.child.estimate(context), 0)
+
+    def lookup(self, context):
+        return context.universe() - self.child.lookup(context)
+
+    def matches(self, context, item):
+        return not self.child.matches(context, item)
+
+
+class Or:
+    def __init__(self, children: list) -> None:
+        self.children = children
+
+    def estimate(self, context):
+        return min(sum(child.estimate(context) for child in self.children), context.size())
+
+    def lookup(self, context):
+        items = set()
+        for child in self.children:
+            items |= child.lookup(context)
+        return items
+
+    def matches(self, context, item):
+        return any(child.matches(context, item) for child in self.children)
+
+
+class And:
+    def __init__(self, children: list) -> None:
+        self.children = children
+
+    def plan(self, context):
+        positives = [child for child in self.children if not isinstance(child, Not)]
+        negatives = [child.child for child in self.children if isinstance(child, Not)]
+        estimates = {id(child): child.estimate(context) for child in positives}
+        positives.sort(key=lambda child: estimates[id(child)])
+        return positives, negatives, estimates
+
+    def estimate(self, context):
+        positives, _, estimates = self.plan(context)
+        if not positives:
+            return context.size()
+        return estimates[id(positives[0])]
+
+    def lookup(self, context):
+        positives, negatives, estimates = self.plan(context)
+        if positives:
+            items = positives[0].lookup(context)
+        else:
+            items = context.universe()
+        for child in positives[1:]:
+            if not items:
+                break
+            if len(items) <= estimates[id(child)]:
+                items = {item for item in items if child.matches(context, item)}
+            else:
+                items &= child.lookup(context)
+        for child in negatives:
+            if not items:
+                break
+            items = {item for item in items if not child.matches(context, item)}
+        return items
+
+    def matches(self, context, item):
+        return all(child.matches(context, item) for child in self.children)
+
+
+class QueryParser:
+    def __init__(self, text: str) -> None:
+        self.tokens = QUERY_TOKEN.findall(text)
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ValueError("Enter a query, e.g. phone:050* AND NOT #work")
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected {self.peek()} in query")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_not()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            children.append(self.parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not(self):
+        if self.peek() == "NOT":
+            self.take()
+            return Not(self.parse_not())
+        return self.parse_atom()
+
+    def parse_atom(self):
+        token = self.take()
+        if token is None or token in KEYWORDS or token == ")":
+            raise ValueError("Query ends without a condition")
+        if token == "(":
+            node = self.parse_or()
+            if self.take() != ")":
+                raise ValueError("Missing ) in query")
+            return node
+        return predicate(token)
+
+
+def predicate(token: str):
+    if token.startswith('"'):
+        return TextPredicate(token.strip('"'))
+    if token.startswith("#"):
+        return TagPredicate(token)
+    field, separator, value = token.partition(":")
+    if not separator:
+        return TextPredicate(token)
+    if field.lower() not in FIELDS:
+        raise ValueError(f"Unknown field {field}, use {', '.join(FIELDS)} or #hashtag")
+    if not value:
+        raise ValueError(f"Enter a value for {field}")
+    return FIELDS[field.lower()](value)
+
+
+def parse_query(text: str):
+    return QueryParser(text).parse()
+
+
+def run_query(text: str, phonebook, notebook, today: date | None = None):
+    context = QueryContext(phonebook, notebook, today)
+    items = parse_query(text).lookup(context)
+    contacts = sorted(name for kind, name in items if kind == "contact")
+    notes = sorted((item for item in items if item[0] == "note"), key=lambda item: (isinstance(item[1], str), item[1]))
+    return render(context, contacts, notes)
+
+
+def render(context: QueryContext, contacts: list, notes: list):
+    for name in contacts:
+        yield context.phonebook.show_record(name, context.today)
+    for item in notes:
+        note = context.notes[item]
+        yield f"{note.value} [{' '.join(context.notebook.tags_of(note))}]"
@@ -0,0 +1,153 @@
+import heapq
+import json
+import os
+import pickle
+import zlib
+from functools import partial
+from operator import itemgetter
+
+from journal import write_atomic
+from snapshot import SegmentedRecords, SnapshotRecords, write_snapshot_file
+
+SEGMENT_SIZE = 1024
+MANIFEST = "manifest.json"
+
+
+def segment_dir(filename: str) -> str:
+    return f"{filename}.segments"
+
+
+def has_segments(filename: str) -> bool:
+    return os.path.exists(os.path.join(segment_dir(filename), MANIFEST))
+
+
+def segment_count(size: int) -> int:
+    count = 1
+    while count * SEGMENT_SIZE < size:
+        count *= 2
+    return count
+
+
+def segment_index(key, count: int) -> int:
+    return zlib.crc32(str(key).encode("utf-8")) % count
+
+
+def blobs(data):
+    if isinstance(data, SegmentedRecords):
+        return data.blob
+    return lambda key: pickle.dumps(data[key])
+
+
+class SegmentStore:
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.directory = segment_dir(filename)
+        self.generation = 0
+        self.count = 0
+        self.compact = False
+        self.sequence = None
+        self.readers = []
+        self.members = []
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding="utf-8") as file:
+                manifest = json.load(file)
+        except FileNotFoundError:
+            return
+        self.generation = manifest["generation"]
+        self.count = manifest["count"]
+        self.compact = manifest.get("compact", False)
+        self.sequence = manifest.get("sequence")
+        self.readers = [None] * self.count
+        self.members = [None] * self.count
+
+    def path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"{self.generation}-{segment:04d}.seg")
+
+    def segment_of(self, key) -> int:
+        return segment_index(key, self.count)
+
+    def reader(self, segment: int) -> SnapshotRecords:
+        reader = self.readers[segment]
+        if reader is None:
+            reader = self.readers[segment] = SnapshotRecords(self.path(segment))
+        return reader
+
+    def members_of(self, segment: int) -> dict:
+        members = self.members[segment]
+        if members is None:
+            members = self.members[segment] = self.reader(segment).sequences()
+        return members
+
+    def next_sequence(self) -> int:
+        if self.sequence is None:
+            self.sequence = 1 + max(
+                (max(self.members_of(segment).values(), default=-1) for segment in range(self.count)), default=-1
+            )
+        return self.sequence
+
+    def order(self):
+        members = [self.members_of(segment) for segment in range(self.count)]
+        for key, _ in heapq.merge(*(group.items() for group in members), key=itemgetter(1)):
+            yield key
+
+    def records(self) -> SegmentedRecords:
+        return SegmentedRecords(self.readers, self.reader, partial(segment_index, count=self.count))
+
+    def load(self) -> dict:
+        return {key: self.reader(self.segment_of(key))[key] for key in self.order()}
+
+    def needs_rewrite(self, size: int) -> bool:
+        return not self.count or size > self.count * SEGMENT_SIZE * 4
+
+    def write_all(self, data) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        old = [self.path(segment) for segment in range(self.count)]
+        self.generation += 1
+        self.count = segment_count(len(data))
+        groups = [{} for _ in range(self.count)]
+        for sequence, key in enumerate(data):
+            groups[self.segment_of(key)][key] = sequence
+        self.sequence = len(data)
+        blob = blobs(data)
+        for segment, members in enumerate(groups):
+            write_snapshot_file(self.path(segment), ((key, blob(key)) for key in members), members)
+        self.write_manifest()
+        for path in old:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.readers = [None] * self.count
+        self.members = groups
+
+    def save(self, data, dirty) -> int:
+        touched = set()
+        sequence = self.next_sequence()
+        for key in dirty:
+            segment = self.segment_of(key)
+            members = self.members_of(segment)
+            if key not in data:
+                members.pop(key, None)
+            elif key not in members:
+                members[key] = self.sequence
+                self.sequence += 1
+            touched.add(segment)
+        if self.sequence != sequence:
+            self.write_manifest()
+        blob = blobs(data)
+        for segment in sorted(touched):
+            reader = self.reader(segment)
+            write_snapshot_file(
+                self.path(segment),
+                (
+                    (key, reader.raw(key) if key not in dirty and key in reader else blob(key))
+                    for key in self.members[segment]
+                ),
+                self.members[segment],
+            )
+            self.readers[segment] = SnapshotRecords(self.path(segment))
+        return len(touched)
+
+    def write_manifest(self) -> None:
+        manifest = {"generation": self.generation, "count": self.count, "compact": self.compact, "sequence": self.sequence}
+        write_atomic(os.path.join(self.directory, MANIFEST), json.dumps(manifest).encode("utf-8"))
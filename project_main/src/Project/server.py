@@ -0,0 +1,123 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sessions import current_session
+
+READ_COMMANDS = {
+    "hello", "help", "show all", "show notes", "phone", "email", "birthday", "birthdays", "next", "search",
+    "reverse", "page", "notes", "find", "hashtag", "tags", "query", "sessions", "stats",
+}
+
+
+class BookServer:
+    def __init__(self, app, workers=8, user=None) -> None:
+        self.app = app
+        self.user = user
+        self.executor = ThreadPoolExecutor(workers)
+
+    def execute(self, line: str, user) -> dict:
+        command, _, _ = self.app.command_table.resolve(line.split(" "))
+        while True:
+            session = self.app.registry.get(user)
+            with session.lock.reading() if command in READ_COMMANDS else session.lock.writing():
+                if session.closed:
+                    continue
+                token = current_session.set(session)
+                try:
+                    return self.app.run_command(line)
+                finally:
+                    current_session.reset(token)
+
+    def switch_user(self, line: str):
+        user = line.split(" ", 1)[1].strip() or None
+        self.app.registry.get(user)
+        return user, {"command": "user", "ok": True, "output": f"Using the books of {user or 'the shared user'}"}
+
+    async def handle(self, reader, writer) -> None:
+        loop = asyncio.get_running_loop()
+        user = self.user
+        try:
+            while line := await reader.readline():
+                line = line.decode("utf-8").strip()
+                if not line:
+                    continue
+                if line.split(" ", 1)[0].lower() == "user":
+                    try:
+                        user, entry = await loop.run_in_executor(self.executor, self.switch_user, line + " ")
+                    except ValueError as error:
+                        entry = {"command": "user", "ok": False, "error": str(error)}
+                else:
+                    entry = await loop.run_in_executor(self.executor, self.execute, line, user)
+                writer.write((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+                if self.app.commands.get(entry["command"]) is self.app.exit:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving on {host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.app.registry.close()
+            self.executor.shutdown()
+
+
+def serve(app, host="127.0.0.1", port=8765, workers=8, user=None) -> None:
+    app.interactive = False
+    try:
+        asyncio.run(BookServer(app, workers, user).serve(host, port))
+    except KeyboardInterrupt:
+        pass
+
+
+async def client(host: str, port: int, command: str, requests: int, latencies: list) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    payload = (command + "\n").encode("utf-8")
+    for _ in range(requests):
+        start = time.perf_counter()
+        writer.write(payload)
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load_test(host: str, port: int, clients: int, requests: int, commands: list[str]) -> str:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(host, port, commands[i % len(commands)], requests, latencies) for i in range(clients))
+    )
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100)
+    return (
+        f"{len(latencies)} requests from {clients} clients in {elapsed:.2f}s "
+        f"({len(latencies) / elapsed:.0f} req/s), p50 {cuts[49] * 1000:.2f} ms, p99 {cuts[98] * 1000:.2f} ms"
+    )
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Load test a running bot server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--command", action="append", help="command to send, repeat to mix commands across clients")
+    options = parser.parse_args(argv)
+    commands = options.command or ["show all"]
+    print(asyncio.run(load_test(options.host, options.port, options.clients, options.requests, commands)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from classes_for_addressbook import AddressBook
+from classes_for_notebook import Notebook
+from startup import lazy_import, timed
+
+USER_PATTERN = re.compile(r"[\w-]{1,64}")
+CONTACT_BYTES = 1024
+NOTE_BYTES = 1536
+BOOKS = ("phonebook", "notebook")
+
+current_session = ContextVar("current_session")
+
+
+class ReadWriteLock:
+    def __init__(self) -> None:
+        self.condition = threading.Condition()
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    @contextmanager
+    def reading(self):
+        with self.condition:
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.readers -= 1
+                if not self.readers:
+                    self.condition.notify_all()
+
+    @contextmanager
+    def writing(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.writer = False
+                self.condition.notify_all()
+
+
+class Session:
+    def __init__(self, user, directory: str, storage="pickle", compact=False) -> None:
+        self.user = user
+        self.directory = directory
+        self.storage = storage
+        self.compact = compact
+        self.address_file = os.path.join(directory, "address_book.bin")
+        self.notes_file = os.path.join(directory, "note_book.bin")
+        self.books = {}
+        self.load_locks = {name: threading.Lock() for name in BOOKS}
+        self.cashe = ""
+        self.lock = ReadWriteLock()
+        self.closed = False
+        self.held = False
+
+    @property
+    def phonebook(self):
+        return self.book("phonebook")
+
+    @property
+    def notebook(self):
+        return self.book("notebook")
+
+    def book(self, name: str):
+        book = self.books.get(name)
+        if book is None:
+            with self.load_locks[name]:
+                book = self.books.get(name)
+                if book is None:
+                    with timed(f"load {name} ({self.user or 'shared'})"):
+                        book = self.open(name)
+                    self.books[name] = book
+        return book
+
+    def open(self, name: str):
+        if name == "phonebook":
+            filename = self.address_file
+            if self.storage == "sqlite":
+                book = lazy_import("sqlite_storage").SQLiteAddressBook(os.path.join(self.directory, "book.db"))
+            else:
+                book = AddressBook(compact=self.compact)
+            book.load_address_book(filename)
+        else:
+            filename = self.notes_file
+            if self.storage == "sqlite":
+                book = lazy_import("sqlite_storage").SQLiteNotebook(os.path.join(self.directory, "book.db"))
+            else:
+                book = Notebook()
+            book.load_notes(filename)
+        book.open_journal(filename)
+        if self.held:
+            book.hold()
+        return book
+
+    def hold(self) -> None:
+        self.held = True
+        for book in list(self.books.values()):
+            book.hold()
+
+    def release(self) -> None:
+        self.held = False
+        for book in list(self.books.values()):
+            book.release()
+
+    def preload(self) -> None:
+        threading.Thread(target=self.load_all, name="preload", daemon=True).start()
+
+    def load_all(self) -> None:
+        for name in BOOKS:
+            if self.closed:
+                return
+            try:
+                self.book(name)
+            except Exception:
+                return
+
+    def save(self) -> None:
+        if "phonebook" in self.books:
+            self.books["phonebook"].save_address_book(self.address_file)
+        if "notebook" in self.books:
+            self.books["notebook"].save_notes(self.notes_file)
+
+    def close(self) -> None:
+        with self.lock.writing():
+            if self.closed:
+                return
+            self.closed = True
+            for lock in self.load_locks.values():
+                lock.acquire()
+            try:
+                self.save()
+                for book in self.books.values():
+                    if book.journal is not None:
+                        book.journal.close()
+                        book.journal = None
+            finally:
+                for lock in self.load_locks.values():
+                    lock.release()
+
+    def size(self) -> int:
+        books = self.books
+        contacts = len(books["phonebook"].data) if "phonebook" in books else 0
+        notes = len(books["notebook"].data) if "notebook" in books else 0
+        return contacts * CONTACT_BYTES + notes * NOTE_BYTES
+
+
+class CurrentBook:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __getattr__(self, attribute):
+        return getattr(getattr(current_session.get(), self.name), attribute)
+
+
+class BookRegistry:
+    def __init__(self, root=".", budget=256 * 1024 * 1024, storage="pickle", compact=False) -> None:
+        self.root = root
+        self.budget = budget
+        self.storage = storage
+        self.compact = compact
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def directory(self, user) -> str:
+        if user is None:
+            return self.root
+        if not USER_PATTERN.fullmatch(user):
+            raise ValueError(f"User name {user} may only contain letters, digits, _ and -")
+        return os.path.join(self.root, "users", user)
+
+    def get(self, user=None) -> Session:
+        with self.lock:
+            session = self.sessions.get(user)
+            if session is not None:
+                self.hits += 1
+                self.sessions.move_to_end(user)
+                return session
+            self.misses += 1
+            session = self.load(user)
+            self.sessions[user] = session
+            self.evict()
+            return session
+
+    def load(self, user) -> Session:
+        directory = self.directory(user)
+        os.makedirs(directory, exist_ok=True)
+        return Session(user, directory, self.storage, self.compact)
+
+    def memory(self) -> int:
+        return sum(session.size() for session in self.sessions.values())
+
+    def evict(self) -> None:
+        while len(self.sessions) > 1 and self.memory() > self.budget:
+            _, session = self.sessions.popitem(last=False)
+            session.close()
+            self.evictions += 1
+
+    def close(self) -> None:
+        with self.lock:
+            while self.sessions:
+                _, session = self.sessions.popitem(last=False)
+                session.close()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self.sessions),
+            "memory": self.memory(),
+            "budget": self.budget,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,137 @@
+import heapq
+import mmap
+import os
+import pickle
+import struct
+from collections.abc import MutableMapping
+from operator import itemgetter
+
+MAGIC = b"ABSNAP01"
+TRAILER = struct.Struct("<Q")
+
+
+def write_snapshot_file(filename: str, items, sequences=None) -> None:
+    temp = f"{filename}.tmp"
+    index = {}
+    with open(temp, "wb") as file:
+        file.write(MAGIC)
+        for key, blob in items:
+            index[key] = (file.tell(), len(blob)) if sequences is None else (file.tell(), len(blob), sequences[key])
+            file.write(blob)
+        index_offset = file.tell()
+        file.write(pickle.dumps(index))
+        file.write(TRAILER.pack(index_offset))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp, filename)
+
+
+class SnapshotRecords(MutableMapping):
+    def __init__(self, filename: str) -> None:
+        with open(filename, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        (index_offset,) = TRAILER.unpack_from(self.map, len(self.map) - TRAILER.size)
+        self.index = pickle.loads(self.map[index_offset:len(self.map) - TRAILER.size])
+        self.changed = {}
+        self.book = None
+
+    def raw(self, key) -> bytes:
+        offset, length = self.index[key][:2]
+        return self.map[offset:offset + length]
+
+    def blob(self, key) -> bytes:
+        if key in self.changed:
+            return pickle.dumps(self.changed[key])
+        return self.raw(key)
+
+    def sequences(self) -> dict:
+        return {key: entry[2] if len(entry) > 2 else 0 for key, entry in self.index.items() if entry is not None}
+
+    def __getitem__(self, key):
+        record = self.changed.get(key)
+        if record is None:
+            record = pickle.loads(self.raw(key))
+            record.book = self.book
+        return record
+
+    def __setitem__(self, key, record) -> None:
+        record.book = self.book
+        self.changed[key] = record
+        self.index.setdefault(key, None)
+
+    def __delitem__(self, key) -> None:
+        del self.index[key]
+        self.changed.pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def __iter__(self):
+        return iter(list(self.index))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+class SegmentedRecords(MutableMapping):
+    def __init__(self, parts: list, open_part, segment_of) -> None:
+        self.parts = parts
+        self.open_part = open_part
+        self.segment_of = segment_of
+        self.order = None
+        self.added = {}
+        self.owner = None
+
+    @property
+    def book(self):
+        return self.owner
+
+    @book.setter
+    def book(self, book) -> None:
+        self.owner = book
+        for part in self.parts:
+            if part is not None:
+                part.book = book
+
+    def load(self, segment: int) -> SnapshotRecords:
+        part = self.parts[segment]
+        if part is None:
+            part = self.parts[segment] = self.open_part(segment)
+        part.book = self.owner
+        return part
+
+    def part(self, key) -> SnapshotRecords:
+        return self.load(self.segment_of(key))
+
+    def ordered(self) -> dict:
+        if self.order is None:
+            parts = [self.load(segment).sequences() for segment in range(len(self.parts))]
+            self.order = dict.fromkeys(key for key, _ in heapq.merge(*(part.items() for part in parts), key=itemgetter(1)))
+            self.order.update(self.added)
+            self.added = {}
+        return self.order
+
+    def blob(self, key) -> bytes:
+        return self.part(key).blob(key)
+
+    def __getitem__(self, key):
+        return self.part(key)[key]
+
+    def __setitem__(self, key, record) -> None:
+        part = self.part(key)
+        if key not in part:
+            (self.added if self.order is None else self.order)[key] = None
+        part[key] = record
+
+    def __delitem__(self, key) -> None:
+        del self.part(key)[key]
+        (self.added if self.order is None else self.order).pop(key, None)
+
+    def __contains__(self, key) -> bool:
+        return key in self.part(key)
+
+    def __iter__(self):
+        return iter(list(self.ordered()))
+
+    def __len__(self) -> int:
+        return sum(len(self.load(segment)) for segment in range(len(self.parts)))
@@ -1,31 +1,54 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
+import argparse
+import os
 import shutil
-import sys
-from . import file_parser as parser
-from .normalize import normalize
+import file_parser as parser
+from normalize import normalize
 
+MEDIA = ["images", "audio", "video", "documents"]
 
-def handle_media(filename: Path, target_folder: Path) -> None:
-    target_folder.mkdir(exist_ok=True, parents=True)
-    filename.replace(target_folder / normalize(filename.name))
 
+def unique_target(target_folder: Path, name: str, reserved: set, source: Path | None = None) -> Path:
+    stem, dot, suffix = name.partition(".") if not name.startswith(".") else (name, "", "")
+    candidate = target_folder / name
+    number = 0
+    while candidate in reserved or candidate.exists() and candidate != source:
+        number += 1
+        candidate = target_folder / f"{stem}_{number}{dot}{suffix}"
+    reserved.add(candidate)
+    return candidate
 
-def handle_other(filename: Path, target_folder: Path) -> None:
-    target_folder.mkdir(exist_ok=True, parents=True)
-    filename.replace(target_folder / normalize(filename.name))
 
+def move(filename: Path, target: Path) -> None:
+    target.parent.mkdir(exist_ok=True, parents=True)
+    filename.replace(target)
 
-def handle_archive(filename: Path, target_folder: Path) -> None:
-    folder_for_file = target_folder / normalize(
-        filename.name.replace(filename.suffix, "")
-    )
+
+def handle_media(filename: Path, target_folder: Path, reserved=None) -> None:
+    move(filename, unique_target(target_folder, normalize(filename.name), set() if reserved is None else reserved, filename))
+
+
+def handle_other(filename: Path, target_folder: Path, reserved=None) -> None:
+    move(filename, unique_target(target_folder, normalize(filename.name), set() if reserved is None else reserved, filename))
+
+
+def extract(filename: Path, folder_for_file: Path) -> bool:
     folder_for_file.mkdir(exist_ok=True, parents=True)
     try:
         shutil.unpack_archive(str(filename.resolve()), str(folder_for_file.resolve()))
     except shutil.ReadError:
         folder_for_file.rmdir()
-        return None
-    filename.unlink()
+        return False
+    return True
+
+
+def handle_archive(filename: Path, target_folder: Path, reserved=None) -> None:
+    folder_for_file = unique_target(
+        target_folder, normalize(filename.name.replace(filename.suffix, "")), set() if reserved is None else reserved
+    )
+    if extract(filename, folder_for_file):
+        filename.unlink()
 
 
 def handle_folder(folder: Path) -> None:
@@ -35,20 +58,67 @@ def handle_folder(folder: Path) -> None:
         print(f"Sorry, we can not delete the folder: {folder}")
 
 
-def sort_dir(folder: Path) -> str:
+def run_bounded(executor, function, jobs, limit: int):
+    if executor is None:
+        for job in jobs:
+            yield job, function(*job)
+        return
+    pending = {}
+    for job in jobs:
+        if len(pending) >= limit:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield pending.pop(future), future.result()
+        pending[executor.submit(function, *job)] = job
+    for future in list(pending):
+        yield pending.pop(future), future.result()
+
+
+def plan(folder: Path, files: dict):
+    reserved = set()
+    moves = []
+    for category in MEDIA:
+        for file in sorted(files["files"][category]):
+            moves.append((file, unique_target(folder / category, normalize(file.name), reserved, file)))
+    for file in sorted(files["other_files"]):
+        moves.append((file, unique_target(file.parent, normalize(file.name), reserved, file)))
+    archives = [
+        (file, unique_target(folder / "archives", normalize(file.name.replace(file.suffix, "")), reserved))
+        for file in sorted(files["files"]["archives"])
+    ]
+    return moves, archives
+
+
+def sort_dir(folder: Path, workers: int | None = None, processes: int | None = None, queue_size: int | None = None) -> str:
     files = parser.scan(folder)
-    for category in ["images", "audio", "video", "documents"]:
-        for file in files["files"][category]:
-            handle_media(file, folder / category)
-    for file in files["other_files"]:
-        handle_other(file, file.parent)
-    for file in files["files"]["archives"]:
-        handle_archive(file, folder / "archives")
+    moves, archives = plan(folder, files)
+    workers = workers or min(32, (os.cpu_count() or 1) + 4)
+    processes = processes or os.cpu_count() or 1
+    if workers == 1:
+        for _ in run_bounded(None, move, moves, 1):
+            pass
+        for (file, _), extracted in run_bounded(None, extract, archives, 1):
+            if extracted:
+                file.unlink()
+    else:
+        with ThreadPoolExecutor(workers) as threads:
+            for _ in run_bounded(threads, move, moves, queue_size or workers * 4):
+                pass
+        if archives:
+            with ProcessPoolExecutor(min(processes, len(archives))) as pool:
+                for (file, _), extracted in run_bounded(pool, extract, archives, queue_size or processes * 2):
+                    if extracted:
+                        file.unlink()
     for folder in files["folders"][::-1]:
         handle_folder(folder)
     return "OK"
 
 
 if __name__ == "__main__":
-    folder_for_scan = Path(sys.argv[1])
-    sort_dir(folder_for_scan.resolve())
+    arguments = argparse.ArgumentParser(description="Sort a folder into images, audio, video, documents and archives")
+    arguments.add_argument("folder", type=Path)
+    arguments.add_argument("--workers", type=int, help="threads moving files, 1 sorts sequentially")
+    arguments.add_argument("--processes", type=int, help="processes unpacking archives")
+    arguments.add_argument("--queue-size", type=int, help="tasks waiting for a free worker at most")
+    options = arguments.parse_args()
+    sort_dir(options.folder.resolve(), options.workers, options.processes, options.queue_size)
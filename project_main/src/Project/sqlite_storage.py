@@ -0,0 +1,439 @@
+import sqlite3
+from calendar import isleap
+from collections.abc import MutableMapping
+from datetime import date
+from classes_for_addressbook import AddressBook, Record, canonical_phone
+from classes_for_notebook import Notebook, RecordNote, Note
+from indexes import birthday_in_year, fold, encode_cursor, decode_cursor, edit_distance, typo_bound, tokenize, closest_words
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    name TEXT PRIMARY KEY,
+    name_fold TEXT NOT NULL,
+    birthday TEXT,
+    birthday_md TEXT
+);
+CREATE INDEX IF NOT EXISTS contacts_name_fold ON contacts (name_fold);
+CREATE INDEX IF NOT EXISTS contacts_birthday_md ON contacts (birthday_md);
+CREATE TABLE IF NOT EXISTS phones (
+    name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    digits TEXT NOT NULL,
+    PRIMARY KEY (name, position)
+);
+CREATE INDEX IF NOT EXISTS phones_digits ON phones (digits);
+CREATE TABLE IF NOT EXISTS emails (
+    name TEXT NOT NULL REFERENCES contacts (name) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (name, position)
+);
+CREATE INDEX IF NOT EXISTS emails_value ON emails (value);
+CREATE TABLE IF NOT EXISTS note_texts (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS note_tags (
+    hashtag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    note_id INTEGER NOT NULL REFERENCES note_texts (id),
+    PRIMARY KEY (hashtag, position)
+);
+CREATE INDEX IF NOT EXISTS note_tags_note ON note_tags (note_id);
+"""
+
+
+def connect(filename: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(filename, isolation_level=None, check_same_thread=False)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("PRAGMA synchronous = NORMAL")
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    migrate_notes(connection)
+    return connection
+
+
+def migrate_notes(connection: sqlite3.Connection) -> None:
+    if not connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes'").fetchone():
+        return
+    with connection:
+        connection.execute("BEGIN")
+        ids = {}
+        for hashtag, position, text in connection.execute("SELECT hashtag, position, text FROM notes ORDER BY rowid").fetchall():
+            if text not in ids:
+                ids[text] = connection.execute("INSERT INTO note_texts (text) VALUES (?)", (text,)).lastrowid
+            connection.execute(
+                "INSERT INTO note_tags (hashtag, position, note_id) VALUES (?, ?, ?)", (hashtag, position, ids[text])
+            )
+        connection.execute("DROP TABLE notes")
+
+
+def month_day(value: date) -> str:
+    return f"{value.month:02}-{value.day:02}"
+
+
+class SQLiteRecords(MutableMapping):
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __getitem__(self, name: str) -> Record:
+        row = self.connection.execute("SELECT birthday FROM contacts WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError(name)
+        phones = self.connection.execute(
+            "SELECT value FROM phones WHERE name = ? ORDER BY position", (name,)
+        ).fetchall()
+        emails = self.connection.execute(
+            "SELECT value FROM emails WHERE name = ? ORDER BY position", (name,)
+        ).fetchall()
+        return Record.from_dict({
+            "name": name,
+            "phones": [phone for phone, in phones],
+            "emails": [email for email, in emails],
+            "birthday": row[0],
+        })
+
+    def __setitem__(self, name: str, record: Record) -> None:
+        birthday = record.birthday.value if record.birthday else None
+        with self.connection:
+            self.connection.execute("BEGIN")
+            self.connection.execute(
+                "INSERT INTO contacts (name, name_fold, birthday, birthday_md) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET birthday = excluded.birthday, birthday_md = excluded.birthday_md",
+                (name, fold(name), birthday.isoformat() if birthday else None, month_day(birthday) if birthday else None),
+            )
+            self.connection.execute("DELETE FROM phones WHERE name = ?", (name,))
+            self.connection.executemany(
+                "INSERT INTO phones (name, position, value, digits) VALUES (?, ?, ?, ?)",
+                [(name, i, phone.value, phone.canonical) for i, phone in enumerate(record.phones)],
+            )
+            self.connection.execute("DELETE FROM emails WHERE name = ?", (name,))
+            self.connection.executemany(
+                "INSERT INTO emails (name, position, value) VALUES (?, ?, ?)",
+                [(name, i, email.value) for i, email in enumerate(record.emails)],
+            )
+
+    def __delitem__(self, name: str) -> None:
+        if self.connection.execute("DELETE FROM contacts WHERE name = ?", (name,)).rowcount == 0:
+            raise KeyError(name)
+
+    def __contains__(self, name) -> bool:
+        return self.connection.execute("SELECT 1 FROM contacts WHERE name = ?", (name,)).fetchone() is not None
+
+    def __iter__(self):
+        for name, in self.connection.execute("SELECT name FROM contacts ORDER BY name"):
+            yield name
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+
+class SQLiteAddressBook(AddressBook):
+    def __init__(self, filename: str) -> None:
+        super().__init__()
+        self.connection = connect(filename)
+        self.data = SQLiteRecords(self.connection)
+
+    def add_record(self, record: Record):
+        record.book = self
+        self.data[record.get_name()] = record
+
+    def delete_record(self, name: str) -> Record:
+        record = self.data[name]
+        del self.data[name]
+        return record
+
+    def record_changed(self, record: Record):
+        self.data[record.get_name()] = record
+
+    def get_records(self, name: str) -> Record:
+        record = super().get_records(name)
+        if record is not None:
+            record.book = self
+        return record
+
+    def records(self, names) -> list[Record]:
+        return [self.get_records(name) for name in names]
+
+    def search(self, criteria: str, ignore_case=False, limit=None) -> list[Record]:
+        match = "instr(lower({0}), lower(:criteria))" if ignore_case else "instr({0}, :criteria)"
+        query = f"""
+            SELECT name, MIN(rank) AS best, MIN(position) FROM (
+                SELECT name, 0 AS rank, {match.format("name")} AS position FROM contacts
+                UNION ALL
+                SELECT name, 1, {match.format("value")} FROM phones
+                UNION ALL
+                SELECT name, 1, {match.format("value")} FROM emails
+                UNION ALL
+                SELECT name, 1, {match.format("birthday")} FROM contacts WHERE birthday IS NOT NULL
+            ) WHERE position > 0
+            GROUP BY name ORDER BY best, MIN(position), name LIMIT :limit
+        """
+        rows = self.connection.execute(query, {"criteria": criteria, "limit": -1 if limit is None else int(limit)})
+        return self.records(name for name, _, _ in rows.fetchall())
+
+    def owners_of(self, phone: str) -> list[Record]:
+        rows = self.connection.execute(
+            "SELECT DISTINCT name FROM phones WHERE digits = ? ORDER BY name", (canonical_phone(phone),)
+        )
+        return self.records(name for name, in rows.fetchall())
+
+    def phones_with_prefix(self, prefix: str, limit=None):
+        prefix = canonical_phone(prefix, prefix=True)
+        rows = self.connection.execute(
+            "SELECT digits, group_concat(name, char(0)) FROM phones WHERE digits >= ? AND digits < ? "
+            "GROUP BY digits ORDER BY digits LIMIT ?",
+            (prefix, prefix + "\uffff", -1 if limit is None else int(limit)),
+        )
+        for digits, names in rows.fetchall():
+            yield digits, self.records(sorted(names.split("\0")))
+
+    def birthdays_between(self, start: date, end: date, today: date | None = None):
+        if today is None:
+            today = start
+        while start <= end:
+            year = start.year
+            last = min(end, date(year, 12, 31))
+            low, high = month_day(start), month_day(last)
+            if not isleap(year) and low <= "02-28" <= high:
+                high = max(high, "02-29")
+            rows = self.connection.execute(
+                "SELECT name, birthday_md FROM contacts WHERE birthday_md BETWEEN ? AND ? ORDER BY birthday_md, name",
+                (low, high),
+            )
+            for name, md in rows.fetchall():
+                birthday = birthday_in_year(year, int(md[:2]), int(md[3:]))
+                yield self.get_records(name), birthday, (birthday - today).days
+            start = date(year + 1, 1, 1)
+
+    def find_names(self, name: str) -> list[str]:
+        rows = self.connection.execute("SELECT name FROM contacts WHERE name_fold = ? ORDER BY name", (fold(name),))
+        return [name for name, in rows.fetchall()]
+
+    def complete_names(self, prefix: str, limit=None) -> list[str]:
+        prefix = fold(prefix)
+        rows = self.connection.execute(
+            "SELECT name FROM contacts WHERE name_fold >= ? AND name_fold < ? ORDER BY name_fold, name LIMIT ?",
+            (prefix, prefix + "\uffff", -1 if limit is None else int(limit)),
+        )
+        return [name for name, in rows.fetchall()]
+
+    def total_pages(self, page_size: int) -> int:
+        return (len(self.data) + page_size - 1) // page_size
+
+    def page(self, number: int, page_size: int) -> list[Record]:
+        rows = self.connection.execute(
+            "SELECT name FROM contacts ORDER BY name LIMIT ? OFFSET ?", (page_size, (number - 1) * page_size)
+        )
+        return self.records(name for name, in rows.fetchall())
+
+    def page_after(self, cursor: str | None, page_size: int):
+        after = decode_cursor(cursor) if cursor else ""
+        rows = self.connection.execute(
+            "SELECT name FROM contacts WHERE name > ? ORDER BY name LIMIT ?", (after, page_size + 1)
+        ).fetchall()
+        names = [name for name, in rows[:page_size]]
+        next_cursor = encode_cursor(names[-1]) if len(rows) > page_size else None
+        return self.records(names), next_cursor
+
+    def index_record(self, record: Record):
+        pass
+
+    def unindex_record(self, name: str):
+        pass
+
+    def reindex(self):
+        pass
+
+    def open_journal(self, filename):
+        pass
+
+    def load_address_book(self, filename):
+        pass
+
+    def save_address_book(self, filename):
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+class SQLiteNotes(MutableMapping):
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __getitem__(self, hashtag: str) -> RecordNote:
+        rows = self.connection.execute(
+            "SELECT note_texts.id, note_texts.text FROM note_tags JOIN note_texts ON note_texts.id = note_tags.note_id "
+            "WHERE note_tags.hashtag = ? ORDER BY note_tags.position",
+            (hashtag,),
+        ).fetchall()
+        if not rows:
+            raise KeyError(hashtag)
+        return RecordNote.from_dict({"hashtag": hashtag, "notes": [text for _, text in rows], "ids": [id for id, _ in rows]})
+
+    def __setitem__(self, hashtag: str, record: RecordNote) -> None:
+        with self.connection:
+            self.connection.execute("BEGIN")
+            for note in record.notes:
+                if note.id is None:
+                    note.id = self.connection.execute("INSERT INTO note_texts (text) VALUES (?)", (note.value,)).lastrowid
+                else:
+                    self.connection.execute(
+                        "INSERT INTO note_texts (id, text) VALUES (?, ?) ON CONFLICT (id) DO UPDATE SET text = excluded.text",
+                        (note.id, note.value),
+                    )
+            previous = self.note_ids(hashtag)
+            self.connection.execute("DELETE FROM note_tags WHERE hashtag = ?", (hashtag,))
+            self.connection.executemany(
+                "INSERT INTO note_tags (hashtag, position, note_id) VALUES (?, ?, ?)",
+                [(hashtag, i, note.id) for i, note in enumerate(record.notes)],
+            )
+            self.release(previous)
+
+    def __delitem__(self, hashtag: str) -> None:
+        with self.connection:
+            self.connection.execute("BEGIN")
+            previous = self.note_ids(hashtag)
+            if self.connection.execute("DELETE FROM note_tags WHERE hashtag = ?", (hashtag,)).rowcount == 0:
+                raise KeyError(hashtag)
+            self.release(previous)
+
+    def note_ids(self, hashtag: str) -> list[int]:
+        return [id for id, in self.connection.execute("SELECT note_id FROM note_tags WHERE hashtag = ?", (hashtag,))]
+
+    def release(self, ids: list[int]) -> None:
+        self.connection.executemany(
+            "DELETE FROM note_texts WHERE id = ? AND NOT EXISTS (SELECT 1 FROM note_tags WHERE note_id = ?)",
+            [(id, id) for id in ids],
+        )
+
+    def __contains__(self, hashtag) -> bool:
+        return self.connection.execute("SELECT 1 FROM note_tags WHERE hashtag = ?", (hashtag,)).fetchone() is not None
+
+    def __iter__(self):
+        for hashtag, in self.connection.execute("SELECT DISTINCT hashtag FROM note_tags ORDER BY hashtag"):
+            yield hashtag
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(DISTINCT hashtag) FROM note_tags").fetchone()[0]
+
+
+class SQLiteNotebook(Notebook):
+    def __init__(self, filename: str) -> None:
+        super().__init__()
+        self.connection = connect(filename)
+        self.data = SQLiteNotes(self.connection)
+
+    def add_record(self, record):
+        record.book = self
+        self.data[record.get_hashtag()] = record
+
+    def delete_record(self, hashtag):
+        record = self.data[hashtag]
+        del self.data[hashtag]
+        return record
+
+    def record_changed(self, record, note=None):
+        self.data[record.get_hashtag()] = record
+
+    def top_tags(self, prefix="", limit=10):
+        rows = self.connection.execute(
+            "SELECT hashtag, COUNT(*) AS count FROM note_tags WHERE hashtag LIKE ? ESCAPE '\\' "
+            "GROUP BY hashtag ORDER BY count DESC, hashtag LIMIT ?",
+            ("#" + prefix.lstrip("#").replace("\\", "\\\\").replace("_", "\\_") + "%", int(limit)),
+        )
+        return rows.fetchall()
+
+    def notes_with_tags(self, hashtags):
+        hashtags = list(dict.fromkeys(hashtags))
+        rows = self.connection.execute(
+            "SELECT note_texts.id, note_texts.text FROM note_tags JOIN note_texts ON note_texts.id = note_tags.note_id "
+            f"WHERE note_tags.hashtag IN ({', '.join('?' * len(hashtags))}) "
+            "GROUP BY note_texts.id HAVING COUNT(DISTINCT note_tags.hashtag) = ? ORDER BY note_texts.id",
+            (*hashtags, len(hashtags)),
+        )
+        notes = [Note(text, id) for id, text in rows.fetchall()]
+        return [(note, self.tags_of(note)) for note in notes]
+
+    def all_notes(self):
+        return [Note(text, id) for id, text in self.connection.execute("SELECT id, text FROM note_texts ORDER BY id")]
+
+    def tags_of(self, note):
+        rows = self.connection.execute(
+            "SELECT DISTINCT hashtag FROM note_tags WHERE note_id = ? ORDER BY hashtag", (note.id,)
+        )
+        return [hashtag for hashtag, in rows.fetchall()]
+
+    def get_records(self, hashtag):
+        record = self.data.get(hashtag)
+        if record is not None:
+            record.book = self
+        return record
+
+    def records(self, hashtags):
+        return [self.get_records(hashtag) for hashtag in hashtags]
+
+    def search(self, value: str, limit=None):
+        rows = self.connection.execute(
+            """
+            SELECT hashtag FROM (
+                SELECT hashtag, MIN(CASE WHEN instr(hashtag, :value) > 0 THEN 0 ELSE 1 END) AS rank
+                FROM note_tags JOIN note_texts ON note_texts.id = note_tags.note_id
+                WHERE instr(hashtag, :value) > 0 OR instr(text, :value) > 0
+                GROUP BY hashtag
+            ) ORDER BY rank, hashtag LIMIT :limit
+            """,
+            {"value": value, "limit": -1 if limit is None else int(limit)},
+        )
+        return self.records(hashtag for hashtag, in rows.fetchall())
+
+    def similar_tags(self, hashtag, limit=5):
+        word = self.tag_word(hashtag)
+        bound = typo_bound(word)
+        found = []
+        for tag, count in self.connection.execute("SELECT hashtag, COUNT(*) FROM note_tags GROUP BY hashtag"):
+            distance = edit_distance(word, self.tag_word(tag), bound)
+            if distance <= bound:
+                found.append((distance, -count, tag))
+        return [tag for _, _, tag in sorted(found)[:limit]]
+
+    def fuzzy_search(self, value: str, limit=None):
+        words = [word for word in value.split() if word not in ("AND", "OR")]
+        hashtags = dict.fromkeys(tag for word in words for tag in self.similar_tags(word))
+        vocabulary = set()
+        for text, in self.connection.execute("SELECT text FROM note_texts"):
+            vocabulary.update(tokenize(text))
+        for term in tokenize(" ".join(words)):
+            for word in closest_words(term, vocabulary):
+                hashtags.update(dict.fromkeys(record.get_hashtag() for record in self.search(word)))
+        return self.records(list(hashtags)[:limit])
+
+    def total_pages(self, page_size):
+        return (len(self.data) + page_size - 1) // page_size
+
+    def page(self, number, page_size):
+        rows = self.connection.execute(
+            "SELECT DISTINCT hashtag FROM note_tags ORDER BY hashtag LIMIT ? OFFSET ?",
+            (page_size, (number - 1) * page_size),
+        )
+        return self.records(hashtag for hashtag, in rows.fetchall())
+
+    def page_after(self, cursor, page_size):
+        after = decode_cursor(cursor) if cursor else ""
+        rows = self.connection.execute(
+            "SELECT DISTINCT hashtag FROM note_tags WHERE hashtag > ? ORDER BY hashtag LIMIT ?", (after, page_size + 1)
+        ).fetchall()
+        hashtags = [hashtag for hashtag, in rows[:page_size]]
+        next_cursor = encode_cursor(hashtags[-1]) if len(rows) > page_size else None
+        return self.records(hashtags), next_cursor
+
+    def reindex(self):
+        pass
+
+    def open_journal(self, filename):
+        pass
+
+    def load_notes(self, filename):
+        pass
+
+    def save_notes(self, filename):
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
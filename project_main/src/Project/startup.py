@@ -0,0 +1,40 @@
+import importlib
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+STARTED = time.perf_counter()
+timings = []
+
+
+def since_start() -> float:
+    return time.perf_counter() - STARTED
+
+
+def record(label: str, seconds: float) -> None:
+    timings.append((label, threading.current_thread().name, seconds))
+
+
+@contextmanager
+def timed(label: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(label, time.perf_counter() - start)
+
+
+def lazy_import(name: str):
+    module = sys.modules.get(name)
+    if module is None:
+        with timed(f"import {name}"):
+            module = importlib.import_module(name)
+    return module
+
+
+def report() -> str:
+    lines = ["Startup profile:"]
+    for label, thread, seconds in timings:
+        lines.append(f"  {label:<32} {seconds * 1000:9.2f} ms  ({thread})")
+    return "\n".join(lines)
@@ -0,0 +1,21 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "Project"))
+
+import bot
+from sessions import BookRegistry, current_session
+
+
+@pytest.fixture
+def books(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    registry = BookRegistry(root=str(tmp_path))
+    monkeypatch.setattr(bot, "registry", registry)
+    monkeypatch.setattr(bot, "interactive", False)
+    token = current_session.set(registry.get())
+    yield registry
+    registry.close()
+    current_session.reset(token)
@@ -0,0 +1,23 @@
+import bot
+
+
+def test_import_accepts_uppercase_extension_and_format(books, tmp_path):
+    contacts = tmp_path / "contacts.CSV"
+    contacts.write_text("name,phones\nann,0501111111\n", encoding="utf-8")
+    entry = bot.run_command(f"import {contacts}")
+    assert entry["ok"] and "1 added" in entry["output"]
+    other = tmp_path / "more.txt"
+    other.write_text("name,phones\nbob,0502222222\n", encoding="utf-8")
+    assert "1 added" in bot.run_command(f"import {other} CSV")["output"]
+
+
+def test_import_reports_unknown_format(books, tmp_path):
+    entry = bot.run_command(f"import {tmp_path / 'contacts.xls'}")
+    assert not entry["ok"] and entry["error"].startswith("Unknown import format xls")
+
+
+def test_import_reports_a_missing_name_column(books, tmp_path):
+    contacts = tmp_path / "contacts.csv"
+    contacts.write_text("phones\n0501111111\n", encoding="utf-8")
+    entry = bot.run_command(f"import {contacts}")
+    assert not entry["ok"] and "name column" in entry["error"]
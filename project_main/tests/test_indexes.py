@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from indexes import BKTree, InvertedIndex
+
+
+def corpus(seed=7, size=300):
+    rnd = random.Random(seed)
+    words = ["common"] * 40 + ["often"] * 20 + ["rare", "odd", "unique", "sparse"] + [f"w{i}" for i in range(60)]
+    index = InvertedIndex()
+    for doc in range(size):
+        index.add(doc, [rnd.choice(words) for _ in range(rnd.randint(3, 15))])
+    return index
+
+
+@pytest.mark.parametrize("terms", [["common", "rare"], ["often", "odd", "w3"], ["unique", "sparse", "common", "often"]])
+@pytest.mark.parametrize("limit", [1, 5, 20])
+def test_or_search_with_limit_returns_the_full_ranking_top(terms, limit):
+    index = corpus()
+    full = index.search(terms, "or")
+    top = index.search(terms, "or", limit)
+    assert [score for score, _ in top] == pytest.approx([score for score, _ in full[:limit]])
+    scores = dict((doc, score) for score, doc in full)
+    assert all(score == pytest.approx(scores[doc]) for score, doc in top)
+
+
+def test_or_search_skips_documents_that_cannot_reach_the_top():
+    index = InvertedIndex()
+    index.add("match", ["rare", "common"])
+    for doc in range(200):
+        index.add(doc, ["common", "filler"])
+    calls = []
+    score = index.score
+
+    def counted(*args):
+        calls.append(args[1])
+        return score(*args)
+
+    index.score = counted
+    assert index.search(["rare", "common"], "or", 1)[0][1] == "match"
+    assert len(calls) < 10
+    calls.clear()
+    assert index.search(["rare", "common"], "or")[0][1] == "match"
+    assert len(calls) == 202
+
+
+def test_bk_tree_returns_a_removed_and_readded_word_once():
+    tree = BKTree(["note", "nose", "none"])
+    tree.flush()
+    tree.remove("nose")
+    tree.add("nose")
+    assert tree.search("nose", 1) == [(0, "nose"), (1, "none"), (1, "note")]
+    tree.remove("nose")
+    assert tree.search("nose", 1) == [(1, "none"), (1, "note")]
@@ -0,0 +1,112 @@
+import io
+import os
+
+import bot
+from classes_for_addressbook import AddressBook, Name, Record
+from classes_for_notebook import Hashtag, Notebook, RecordNote
+from journal import Journal, fold_journal, journal_name, replay
+
+
+def open_book(filename):
+    book = AddressBook()
+    book.load_address_book(filename)
+    book.open_journal(filename)
+    return book
+
+
+def test_replay_stops_at_a_truncated_tail(tmp_path):
+    filename = str(tmp_path / "journal")
+    journal = Journal(filename)
+    for key in "abc":
+        journal.append({"op": "delete", "key": key})
+    journal.close()
+    with open(filename, "r+b") as file:
+        file.truncate(os.path.getsize(filename) - 4)
+    assert [entry["key"] for entry in replay(filename)] == ["a", "b"]
+
+
+def test_book_recovers_after_a_torn_write_and_keeps_journaling(tmp_path):
+    filename = str(tmp_path / "address_book.bin")
+    book = open_book(filename)
+    for name in ("ann", "bob", "cid"):
+        book.add_record(Record(Name(name), "0501111111"))
+    book.journal.close()
+    name = journal_name(filename)
+    with open(name, "r+b") as file:
+        file.truncate(os.path.getsize(name) - 10)
+
+    book = open_book(filename)
+    assert list(book.data) == ["ann", "bob"]
+    book.add_record(Record(Name("dan"), "0502222222"))
+    book.journal.close()
+
+    book = open_book(filename)
+    assert list(book.data) == ["ann", "bob", "dan"]
+    assert [phone.value for phone in book.get_records("dan").phones] == ["0502222222"]
+    book.journal.close()
+
+
+def test_replaying_entries_already_in_the_snapshot_keeps_notes_single(tmp_path, monkeypatch):
+    filename = str(tmp_path / "note_book.bin")
+    notebook = Notebook()
+    notebook.open_journal(filename)
+    notebook.add_record(RecordNote(Hashtag("#todo"), note="first"))
+    notebook.save_notes(filename)
+    notebook.get_records("#todo").add_note("second")
+    notebook.get_records("#todo").edit_note("second", "second edited")
+    monkeypatch.setattr(notebook.journal, "reset", lambda: None)
+    notebook.save_notes(filename)
+    notebook.journal.close()
+
+    for _ in range(2):
+        loaded = Notebook()
+        loaded.load_notes(filename)
+        loaded.open_journal(filename)
+        assert [note.value for note in loaded.get_records("#todo").notes] == ["first", "second edited"]
+        loaded.save_notes(filename)
+        loaded.journal.close()
+
+
+def test_a_fold_interrupted_before_removing_the_rotated_journal_replays_cleanly(tmp_path):
+    filename = str(tmp_path / "note_book.bin")
+    notebook = Notebook()
+    notebook.add_record(RecordNote(Hashtag("#todo"), note="first"))
+    notebook.save_notes(filename)
+    notebook.open_journal(filename)
+    notebook.get_records("#todo").add_note("second")
+    rotated = notebook.journal.rotate()
+    with open(rotated, encoding="utf-8") as file:
+        kept = file.read()
+    fold_journal(filename, rotated, notebook.read_snapshot, notebook.apply_entry, notebook.write_snapshot)
+    with open(rotated, "w", encoding="utf-8") as file:
+        file.write(kept)
+    notebook.journal.close()
+
+    loaded = Notebook()
+    loaded.load_notes(filename)
+    loaded.open_journal(filename)
+    assert [note.value for note in loaded.get_records("#todo").notes] == ["first", "second"]
+    loaded.journal.close()
+
+
+def test_a_held_journal_writes_once_on_release(tmp_path):
+    filename = str(tmp_path / "journal")
+    journal = Journal(filename)
+    journal.hold()
+    for key in "abc":
+        journal.append({"op": "delete", "key": key})
+    assert list(replay(filename)) == []
+    journal.release()
+    assert [entry["key"] for entry in replay(filename)] == ["a", "b", "c"]
+    journal.close()
+
+
+def test_batch_mode_defers_spelling_inserts_until_a_search(books):
+    notebook = books.get().notebook
+    lines = [f"note entry {i} #tag{i}" for i in range(300)]
+    assert bot.run_batch(lines, out=io.StringIO()) == 300
+    assert len(notebook.tag_spelling.pending) >= 300
+    assert not notebook.tag_spelling.held
+    assert not notebook.journal.held
+    assert (0, "tag42") in notebook.tag_spelling.search("tag42", 1)
+    assert not notebook.tag_spelling.pending
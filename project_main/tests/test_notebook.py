@@ -0,0 +1,68 @@
+from classes_for_notebook import Hashtag, Note, Notebook, RecordNote
+
+
+def add_note(notebook, text, *hashtags):
+    note = Note(text)
+    for hashtag in hashtags:
+        record = notebook.get_records(hashtag)
+        if record:
+            record.add_note(note)
+        else:
+            notebook.add_record(RecordNote(Hashtag(hashtag), note=note))
+    return note
+
+
+def test_text_index_holds_one_document_per_note():
+    notebook = Notebook()
+    first = add_note(notebook, "buy milk", "#shop", "#home")
+    second = add_note(notebook, "buy bread", "#shop")
+    assert set(notebook.text_index.lengths) == {first.id, second.id}
+    assert set(notebook.text_index.postings["buy"]) == {first.id, second.id}
+    assert set(notebook.text_index.postings["home"]) == {first.id}
+
+
+def test_edit_reindexes_only_the_changed_note(monkeypatch):
+    notebook = Notebook()
+    for i in range(20):
+        add_note(notebook, f"entry {i}", "#log", "#work")
+    calls = []
+    add = notebook.text_index.add
+    monkeypatch.setattr(notebook.text_index, "add", lambda doc, tokens: calls.append(doc) or add(doc, tokens))
+    notebook.get_records("#log").edit_note("entry 3", "renamed entry")
+    assert len(calls) == 1
+    assert [record.get_hashtag() for record in notebook.search("renamed")] == ["#log", "#work"]
+    assert notebook.search("3") == []
+
+
+def test_deleting_a_hashtag_drops_its_word_from_shared_notes():
+    notebook = Notebook()
+    add_note(notebook, "plan the trip", "#travel", "#todo")
+    notebook.delete_record("#travel")
+    assert notebook.search("travel") == []
+    assert [record.get_hashtag() for record in notebook.search("trip")] == ["#todo"]
+    notebook.delete_record("#todo")
+    assert notebook.text_index.lengths == {}
+
+
+def test_search_limit_counts_hashtags_not_notes():
+    notebook = Notebook()
+    for i in range(6):
+        add_note(notebook, "same words here", "#a")
+    add_note(notebook, "same words", "#b")
+    assert [record.get_hashtag() for record in notebook.search("same words", limit=2)] == ["#b", "#a"]
+
+
+def test_journaled_edit_replays_into_every_tag(tmp_path):
+    filename = str(tmp_path / "note_book.bin")
+    notebook = Notebook()
+    notebook.open_journal(filename)
+    add_note(notebook, "draft", "#a", "#b")
+    notebook.get_records("#a").edit_note("draft", "final")
+    notebook.journal.close()
+
+    loaded = Notebook()
+    loaded.load_notes(filename)
+    loaded.open_journal(filename)
+    assert [note.value for note in loaded.get_records("#b").notes] == ["final"]
+    assert [record.get_hashtag() for record in loaded.search("final")] == ["#a", "#b"]
+    loaded.journal.close()
@@ -0,0 +1,25 @@
+import bot
+from indexes import decode_cursor, encode_cursor
+
+
+def test_cursors_are_prefixed_and_round_trip():
+    cursor = encode_cursor("bob")
+    assert cursor.startswith("@")
+    assert decode_cursor(cursor) == "bob"
+
+
+def test_page_follows_the_printed_cursor(books):
+    for name, phone in (("ann", "0501111111"), ("bob", "0502222222"), ("cid", "0503333333")):
+        bot.run_command(f"add {name} {phone}")
+    first = bot.run_command("page 1 2")["output"].splitlines()
+    cursor = first[-1].split(": ")[1]
+    assert first[-2] == "Page 1/2"
+    second = bot.run_command(f"page {cursor} 2")["output"]
+    assert "cid" in second and "ann" not in second
+
+
+def test_digit_arguments_are_always_page_numbers(books):
+    bot.run_command("add ann 0501111111")
+    assert bot.run_command("page 12 1")["output"].startswith("Invalid page number")
+    unprefixed = bot.run_command("page YW5u 1")
+    assert not unprefixed["ok"] and "@" in unprefixed["error"]
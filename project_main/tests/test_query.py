@@ -0,0 +1,85 @@
+import pytest
+
+import bot
+from query import And, Not, Or, PhonePredicate, QueryContext, TagPredicate, TextPredicate, parse_query
+from sessions import current_session
+
+
+def test_query_lists_notes_by_numeric_id(books):
+    for number in range(1, 12):
+        bot.run_command(f"note entry {number} #log")
+    entry = bot.run_command("query #log")
+    assert entry["ok"]
+    assert entry["output"].splitlines() == [f"entry {number} [#log]" for number in range(1, 12)]
+
+
+def fill(names):
+    for i, name in enumerate(names):
+        prefix = "050" if i % 3 else "067"
+        bot.run_command(f"add {name} {prefix}{i:07d}")
+        if i % 2:
+            bot.run_command(f"add {name} {name}@corp.com")
+    bot.run_command("note call ann tomorrow #work")
+    bot.run_command("note buy milk #home")
+    bot.run_command("note review the plan #work #home")
+
+
+def test_reverse_rejects_a_prefix_without_digits(books):
+    fill(["ann", "bob"])
+    entry = bot.run_command("reverse abc")
+    assert not entry["ok"]
+    assert entry["error"] == "Enter a phone number or the first digits of one"
+    assert bot.run_command("reverse 067")["output"] == "ann: 0670000000"
+
+
+def test_search_takes_a_limit_with_or_without_the_case_flag(books):
+    fill(["ann", "anna", "annette"])
+
+    def names(line):
+        return [row.split(":")[0] for row in bot.run_command(line)["output"].splitlines()]
+
+    assert names("search ann limit=2") == ["ann", "anna"]
+    assert names("search ANN i limit=2") == ["ann", "anna"]
+    assert names("search ANN i") == ["ann", "anna", "annette"]
+    assert bot.run_command("search ANN limit=2")["output"] == "No records found for that criteria"
+
+
+def test_parse_query_binds_not_then_and_then_or():
+    node = parse_query("phone:050* OR NOT #work name:ann")
+    assert isinstance(node, Or)
+    first, second = node.children
+    assert isinstance(first, PhonePredicate)
+    assert isinstance(second, And)
+    assert isinstance(second.children[0], Not) and isinstance(second.children[0].child, TagPredicate)
+    assert isinstance(parse_query("(phone:050* OR #work) AND name:ann"), And)
+
+
+def test_and_plans_the_most_selective_condition_first(books):
+    fill(["ann", "bob", "cid", "dan", "eve", "fay", "gus"])
+    context = QueryContext(current_session.get().phonebook, current_session.get().notebook)
+    node = parse_query("phone:050* AND email:@corp.com AND name:ann AND NOT #work")
+    positives, negatives, estimates = node.plan(context)
+    assert [estimates[id(child)] for child in positives] == sorted(estimates[id(child)] for child in positives)
+    assert isinstance(positives[0], TextPredicate) and positives[0].field == "name"
+    assert len(negatives) == 1 and isinstance(negatives[0], TagPredicate)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "phone:050* AND email:@corp.com",
+        "phone:067* OR #home",
+        "NOT phone:050*",
+        "email:@corp.com AND NOT name:bob",
+        "(phone:050* OR #work) AND NOT email:@corp.com",
+        "NOT #work AND NOT #home",
+        "plan OR milk",
+    ],
+)
+def test_lookup_agrees_with_matching_every_item(books, text):
+    fill(["ann", "bob", "cid", "dan", "eve", "fay", "gus"])
+    context = QueryContext(current_session.get().phonebook, current_session.get().notebook)
+    node = parse_query(text)
+    expected = {item for item in context.universe() if node.matches(context, item)}
+    assert node.lookup(context) == expected
+    assert expected
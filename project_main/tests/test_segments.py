@@ -0,0 +1,157 @@
+import os
+
+import segments
+from classes_for_addressbook import AddressBook, ColumnarRecords, Name, Record
+
+
+def test_compact_layout_survives_save_and_load(tmp_path):
+    filename = str(tmp_path / "book.bin")
+    book = AddressBook(compact=True)
+    book.add_record(Record(Name("ann"), "0501111111"))
+    book.add_record(Record(Name("bob"), "0502222222"))
+    book.save_address_book(filename)
+    book.get_records("ann").add_phone("0503333333")
+    book.save_address_book(filename)
+
+    loaded = AddressBook()
+    loaded.load_address_book(filename)
+    assert isinstance(loaded.data, ColumnarRecords)
+    assert [phone.value for phone in loaded.get_records("ann").phones] == ["0501111111", "0503333333"]
+    assert [phone.value for phone in loaded.get_records("bob").phones] == ["0502222222"]
+
+
+def test_reload_keeps_insertion_order_after_partial_saves(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "SEGMENT_SIZE", 2)
+    filename = str(tmp_path / "book.bin")
+    names = ["zed", "amy", "kim", "bob", "lea", "dan"]
+    book = AddressBook()
+    for name in names:
+        book.add_record(Record(Name(name), "0501111111"))
+    book.save_address_book(filename)
+    assert book.store.count == 4
+    book.add_record(Record(Name("eve"), "0502222222"))
+    book.add_record(Record(Name("ann"), "0503333333"))
+    book.delete_record("kim")
+    book.get_records("amy").add_phone("0504444444")
+    book.save_address_book(filename)
+
+    loaded = AddressBook()
+    loaded.load_address_book(filename)
+    expected = ["zed", "amy", "bob", "lea", "dan", "eve", "ann"]
+    assert list(loaded.data) == expected
+    assert [record.get_name() for record in loaded] == expected
+    assert len(loaded.get_records("amy").phones) == 2
+
+
+def test_tiny_book_writes_one_segment(tmp_path):
+    filename = str(tmp_path / "book.bin")
+    book = AddressBook()
+    book.add_record(Record(Name("ann"), "0501111111"))
+    book.save_address_book(filename)
+    assert len([name for name in os.listdir(segments.segment_dir(filename)) if name.endswith(".seg")]) == 1
+
+
+def test_partial_saves_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "SEGMENT_SIZE", 4)
+    filename = str(tmp_path / "book.bin")
+    names = [first + second for first in "abcde" for second in "fghijklm"]
+    data = {name: Record(Name(name), "0501111111") for name in names}
+    store = segments.SegmentStore(filename)
+    store.write_all(data)
+    for step in range(3):
+        dirty = {}
+        for name in names[step::7]:
+            if name in data:
+                data[name].add_phone(f"050222222{step}")
+                dirty[name] = None
+        del data[names[step * 5]]
+        dirty[names[step * 5]] = None
+        data[f"new{'xyz'[step]}"] = Record(Name(f"new{'xyz'[step]}"), "0503333333")
+        dirty[f"new{'xyz'[step]}"] = None
+        assert store.save(data, dirty) < store.count
+    loaded = segments.SegmentStore(filename).load()
+    assert list(loaded) == list(data)
+    assert [record.to_dict() for record in loaded.values()] == [record.to_dict() for record in data.values()]
+
+
+def test_segmented_book_grows_past_the_rewrite_threshold(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "SEGMENT_SIZE", 2)
+    filename = str(tmp_path / "book.bin")
+    book = AddressBook()
+    book.add_record(Record(Name("ann"), "0501111111"))
+    book.save_address_book(filename)
+
+    book = AddressBook()
+    book.load_address_book(filename)
+    names = [first + second for first in "bcd" for second in "efghij"]
+    for name in names:
+        book.add_record(Record(Name(name), "0502222222"))
+    book.save_address_book(filename)
+    assert book.store.count > 1
+    book.get_records("ann").add_phone("0503333333")
+    book.add_record(Record(Name("zed"), "0504444444"))
+    book.save_address_book(filename)
+
+    loaded = AddressBook()
+    loaded.load_address_book(filename)
+    assert list(loaded.data) == ["ann", *names, "zed"]
+    assert len(loaded.get_records("ann").phones) == 2
+
+
+def test_compact_book_keeps_tracking_edits_after_a_delete(tmp_path):
+    filename = str(tmp_path / "book.bin")
+    book = AddressBook(compact=True)
+    book.open_journal(filename)
+    for name in ("ann", "bob", "cid"):
+        book.add_record(Record(Name(name), "0501111111"))
+    deleted = book.delete_record("bob")
+    assert deleted.get_name() == "bob" and deleted.book is None
+    book.get_records("ann").add_phone("0509999999")
+    assert [record.get_name() for record in book.owners_of("0509999999")] == ["ann"]
+    book.save_address_book(filename)
+    book.journal.close()
+
+    loaded = AddressBook()
+    loaded.load_address_book(filename)
+    assert list(loaded.data) == ["ann", "cid"]
+    assert [phone.value for phone in loaded.get_records("ann").phones] == ["0501111111", "0509999999"]
+
+
+def test_compact_session_opens_columnar_books(books, tmp_path):
+    import bot
+
+    books.compact = True
+    books.close()
+    session = books.get()
+    bot.current_session.set(session)
+    assert isinstance(session.phonebook.data, ColumnarRecords)
+    assert bot.run_command("add ann 0501111111")["ok"]
+    assert bot.run_command("add ann ann@example.com")["ok"]
+    assert "ann@example.com" in bot.run_command("email ann")["output"]
+
+
+def test_segment_indexes_load_lazily_and_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(segments, "SEGMENT_SIZE", 2)
+    filename = str(tmp_path / "book.bin")
+    names = [first + second for first in "abcd" for second in "efgh"]
+    book = AddressBook()
+    for name in names:
+        book.add_record(Record(Name(name), "0501111111"))
+    book.save_address_book(filename)
+
+    opened = []
+
+    class CountingRecords(segments.SnapshotRecords):
+        def __init__(self, path):
+            opened.append(path)
+            super().__init__(path)
+
+    monkeypatch.setattr(segments, "SnapshotRecords", CountingRecords)
+    book = AddressBook()
+    book.load_address_book(filename)
+    assert opened == []
+    book.get_records("bf").add_phone("0502222222")
+    assert len(opened) == 1
+    book.save_address_book(filename)
+    assert list(book.data) == names
+    assert len(opened) == book.store.count + 1
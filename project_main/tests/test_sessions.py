@@ -0,0 +1,76 @@
+import threading
+import time
+
+from sessions import ReadWriteLock
+
+
+def start(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def test_readers_share_the_lock():
+    lock = ReadWriteLock()
+    both_inside = threading.Barrier(2, timeout=2)
+
+    def read():
+        with lock.reading():
+            both_inside.wait()
+
+    threads = [start(read) for _ in range(2)]
+    for thread in threads:
+        thread.join(2)
+    assert not both_inside.broken and not any(thread.is_alive() for thread in threads)
+
+
+def test_writer_waits_for_readers_and_blocks_new_ones():
+    lock = ReadWriteLock()
+    order = []
+    reading = threading.Event()
+    release = threading.Event()
+
+    def first_reader():
+        with lock.reading():
+            reading.set()
+            release.wait(2)
+            order.append("first reader")
+
+    def writer():
+        with lock.writing():
+            order.append("writer")
+
+    def late_reader():
+        with lock.reading():
+            order.append("late reader")
+
+    threads = [start(first_reader)]
+    assert reading.wait(2)
+    threads.append(start(writer))
+    while not lock.waiting_writers:
+        time.sleep(0.01)
+    threads.append(start(late_reader))
+    time.sleep(0.1)
+    assert order == []
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    assert order == ["first reader", "writer", "late reader"]
+
+
+def test_writers_exclude_each_other():
+    lock = ReadWriteLock()
+    inside = []
+    overlaps = []
+
+    def write():
+        for _ in range(200):
+            with lock.writing():
+                inside.append(1)
+                overlaps.append(len(inside))
+                inside.pop()
+
+    threads = [start(write) for _ in range(4)]
+    for thread in threads:
+        thread.join(5)
+    assert len(overlaps) == 800 and max(overlaps) == 1
@@ -0,0 +1,43 @@
+import zipfile
+
+import bot
+
+
+def test_sort_command_sorts_a_folder(books, tmp_path):
+    folder = tmp_path / "mess"
+    (folder / "nested").mkdir(parents=True)
+    (folder / "photo 1.jpg").write_text("first")
+    (folder / "nested" / "photo_1.jpg").write_text("second")
+    (folder / "nested" / "notes.txt").write_text("text")
+    with zipfile.ZipFile(folder / "pack.zip", "w") as archive:
+        archive.writestr("inside.txt", "payload")
+
+    entry = bot.run_command(f"sort {folder} 2")
+
+    assert entry == {"command": "sort", "ok": True, "output": "OK"}
+    assert sorted(path.name for path in (folder / "images").iterdir()) == ["photo_1.jpg", "photo_1_1.jpg"]
+    assert (folder / "images" / "photo_1.jpg").read_text() == "second"
+    assert (folder / "documents" / "notes.txt").exists()
+    assert (folder / "archives" / "pack" / "inside.txt").read_text() == "payload"
+    assert not (folder / "pack.zip").exists()
+    assert not (folder / "nested").exists()
+
+
+def test_sort_sequential_and_parallel_agree(books, tmp_path):
+    layouts = []
+    for workers in ("1", "4"):
+        folder = tmp_path / f"mess{workers}"
+        folder.mkdir()
+        for i in range(20):
+            (folder / f"a {i}.mp3").write_text(str(i))
+            (folder / f"a_{i}.mp3").write_text(str(i))
+        assert bot.run_command(f"sort {folder} {workers}")["ok"]
+        layouts.append(sorted((path.name, path.read_text()) for path in (folder / "audio").iterdir()))
+    assert layouts[0] == layouts[1]
+
+
+def test_sort_reports_bad_arguments(books, tmp_path):
+    missing = bot.run_command(f"sort {tmp_path / 'missing'}")
+    assert not missing["ok"] and "not found" in missing["error"]
+    workers = bot.run_command(f"sort {tmp_path} none")
+    assert not workers["ok"] and "workers" in workers["error"]
@@ -0,0 +1,58 @@
+import sqlite3
+
+from sqlite_storage import SQLiteNotebook
+from classes_for_notebook import Hashtag, Note, RecordNote
+
+
+def add_note(notebook, text, *hashtags):
+    note = Note(text)
+    for hashtag in hashtags:
+        record = notebook.get_records(hashtag)
+        if record:
+            record.add_note(note)
+        else:
+            notebook.add_record(RecordNote(Hashtag(hashtag), note=note))
+
+
+def test_modify_updates_every_tag_of_a_note(tmp_path):
+    notebook = SQLiteNotebook(str(tmp_path / "book.db"))
+    add_note(notebook, "hello world", "#work", "#urgent")
+    record = notebook.get_records("#work")
+    record.edit_note("hello world", "bye world")
+
+    assert [note.value for note in notebook.get_records("#urgent").notes] == ["bye world"]
+    assert [(note.value, tags) for note, tags in notebook.notes_with_tags(["#urgent"])] == [
+        ("bye world", ["#urgent", "#work"])
+    ]
+
+
+def test_deleting_the_last_tag_drops_the_note(tmp_path):
+    notebook = SQLiteNotebook(str(tmp_path / "book.db"))
+    add_note(notebook, "shared", "#a", "#b")
+    notebook.delete_record("#a")
+    assert [note.value for note in notebook.all_notes()] == ["shared"]
+    notebook.delete_record("#b")
+    assert notebook.all_notes() == []
+
+
+def test_old_notes_table_is_migrated(tmp_path):
+    filename = str(tmp_path / "book.db")
+    connection = sqlite3.connect(filename)
+    connection.execute("CREATE TABLE notes (hashtag TEXT, position INTEGER, text TEXT, PRIMARY KEY (hashtag, position))")
+    connection.executemany("INSERT INTO notes VALUES (?, ?, ?)", [("#a", 0, "shared"), ("#b", 0, "shared"), ("#b", 1, "own")])
+    connection.commit()
+    connection.close()
+
+    notebook = SQLiteNotebook(filename)
+    notebook.get_records("#a").edit_note("shared", "changed")
+    assert [note.value for note in notebook.get_records("#b").notes] == ["changed", "own"]
+
+
+def test_fuzzy_search_corrects_note_words_like_the_memory_notebook(tmp_path):
+    from classes_for_notebook import Notebook
+
+    for notebook in (Notebook(), SQLiteNotebook(str(tmp_path / "book.db"))):
+        add_note(notebook, "buy milk", "#shop")
+        add_note(notebook, "call bob", "#work")
+        assert [record.get_hashtag() for record in notebook.fuzzy_search("mlik")] == ["#shop"]
+        assert [record.get_hashtag() for record in notebook.fuzzy_search("clal")] == ["#work"]